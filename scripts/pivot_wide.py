@@ -1,56 +1,34 @@
 # scripts/make_single_pivot.py
 # -*- coding: utf-8 -*-
-import argparse, unicodedata, re, pandas as pd
+import argparse
 from pathlib import Path
-
-def _slug(s: str) -> str:
-    if s is None: return "total"
-    s = str(s).strip().lower()
-    s = unicodedata.normalize("NFKD", s).encode("ascii","ignore").decode("ascii")
-    s = re.sub(r"[^a-z0-9]+","_", s).strip("_")
-    return s or "total"
-
-def pivot_metric(df: pd.DataFrame, metric: str, fillna0: bool) -> pd.DataFrame:
-    d = df[df["metric"] == metric].copy()
-    # métricas sin dimensión -> columna 'total'
-    if d["dim_name"].isna().all() and d["dim_value"].isna().all():
-        d = d.assign(dim_value="total")
-    d["dim_value"] = d["dim_value"].apply(_slug)
-    wide = d.pivot_table(
-        index=["year","region"],
-        columns="dim_value",
-        values="value",
-        aggfunc="sum",
-        observed=True
-    )
-    if fillna0:
-        wide = wide.fillna(0)
-    wide.columns = [str(c) for c in wide.columns]
-    return wide.sort_index(axis=1)
+from tesis_prevencion_siniestros_transito.dataset import read_long
+from tesis_prevencion_siniestros_transito.wide import pivot_coo, pivot_wide
 
 def main():
     ap = argparse.ArgumentParser(description="Generar un único tablón ancho para ML.")
-    ap.add_argument("parquet_in", help="Parquet consolidado (tabla larga).")
+    ap.add_argument("parquet_in", help="Parquet consolidado (tabla larga) o dataset particionado metric=/year=.")
     ap.add_argument("-o","--outdir", default="data/processed", help="Carpeta de salida.")
     ap.add_argument("--fillna0", action="store_true", help="Rellenar NaN con 0.")
+    ap.add_argument("--metric", action="append", help="Solo esta métrica (repetible).")
+    ap.add_argument("--desde", type=int, help="Año inicial (inclusive).")
+    ap.add_argument("--hasta", type=int, help="Año final (inclusive).")
+    ap.add_argument("--sparse", action="store_true",
+                    help="Salida dispersa: .npz (scipy.sparse.load_npz) + Parquet COO, sin tablón denso.")
     args = ap.parse_args()
 
     outdir = Path(args.outdir); outdir.mkdir(parents=True, exist_ok=True)
-    df = pd.read_parquet(args.parquet_in)
-    df["region"] = df["region"].astype(str)
-    df["metric"] = df["metric"].astype(str)
-
-    base = None
-    for m in sorted(df["metric"].unique()):
-        w = pivot_metric(df, m, fillna0=args.fillna0)
-        pref = _slug(m)
-        w = w.rename(columns={c: f"{pref}__{c}" for c in w.columns})
-        base = w if base is None else base.join(w, how="outer")
-
-    base = base.reset_index()
-    if args.fillna0:
-        cols = [c for c in base.columns if c not in ("year","region")]
-        base[cols] = base[cols].fillna(0)
+    df = read_long(args.parquet_in, metrics=args.metric, years=(args.desde, args.hasta))
+    if args.sparse:
+        coo = pivot_coo(df, fillna0=args.fillna0)
+        out_npz = outdir / "siniestros_normalizado_pivot_sparse.npz"
+        out_coo = outdir / "siniestros_normalizado_pivot_coo.parquet"
+        coo.save_npz(out_npz)
+        coo.to_long().to_parquet(out_coo, index=False)
+        rows, cols = coo.shape
+        print(f"[OK] {out_npz} y {out_coo} -> {rows} filas, {cols} columnas, {len(coo.data)} celdas con dato")
+        return
+    base = pivot_wide(df, fillna0=args.fillna0)
 
     out_parquet = outdir / "siniestros_normalizado_pivot.parquet"
     out_csv = outdir / "siniestros_normalizado_pivot.csv"
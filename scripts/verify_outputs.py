@@ -1,21 +1,32 @@
-
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-import argparse, pandas as pd
+import argparse, sys
+from tesis_prevencion_siniestros_transito.dataset import head_long, summarize_long
 
 def main():
-    parser = argparse.ArgumentParser(description="Verificar parquet consolidado")
-    parser.add_argument("parquet_path", help="Ruta al archivo Parquet a verificar")
+    parser = argparse.ArgumentParser(description="Verificar parquet consolidado (solo metadatos: no lee la tabla completa)")
+    parser.add_argument("parquet_path", help="Ruta al archivo Parquet (o dataset particionado) a verificar")
+    parser.add_argument("--metric", action="append", help="Solo esta métrica (repetible).")
     args = parser.parse_args()
-    df = pd.read_parquet(args.parquet_path)
-    print("Filas:", len(df))
-    print("Columnas:", df.columns.tolist())
-    print("Schema:", df.dtypes.to_dict())
+    try:
+        summary = summarize_long(args.parquet_path, metrics=args.metric)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] No se pudo leer el Parquet: {e}", file=sys.stderr)
+        sys.exit(1)
+    print("Filas:", summary.rows)
+    print("Columnas:", summary.schema.names)
+    print("Schema:", {f.name: str(f.type) for f in summary.schema})
     print("\nMétricas (top 10):")
-    print(df["metric"].value_counts().head(10))
-    print("\nAños:", df["year"].min(), "..", df["year"].max())
+    for metric, count in list(summary.metrics.items())[:10]:
+        print(f"  {metric}: {count}")
+    print("\nAños:", summary.years[0], "..", summary.years[1])
+    print("Valores:", summary.values[0], "..", summary.values[1])
     print("\nMuestra:")
-    print(df.sample(10, random_state=1))
+    print(head_long(args.parquet_path, 10, metrics=args.metric))
+    for problem in summary.problems:
+        print(f"[ERROR] {problem}", file=sys.stderr)
+    if summary.problems:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
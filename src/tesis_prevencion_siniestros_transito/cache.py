@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Caché en disco de hojas normalizadas para re-ejecuciones incrementales.
+
+Cada hoja se identifica por un hash de su contenido crudo (la grilla header=None)
+más los parámetros del handler que la procesa. Si el libro de un mes a otro solo
+cambia en una o dos hojas, el resto se recupera del fragmento Parquet guardado.
+Cuando el tamaño total supera el límite se borran los fragmentos menos usados.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+import pandas as pd
+
+# Subir cuando cambie la lógica de los parsers: invalida todo lo cacheado
+CACHE_VERSION = 2
+
+_LOG_KEY = b"tpst.log"
+
+class SheetResultCache:
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(sheet: str, grid: pd.DataFrame, spec) -> str:
+        h = hashlib.sha256()
+        h.update(json.dumps([CACHE_VERSION, sheet, spec], sort_keys=True, default=str).encode("utf-8"))
+        h.update(repr((grid.shape, [str(t) for t in grid.dtypes])).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(grid, index=False).to_numpy().tobytes())
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.dir / f"{key}.parquet"
+
+    def get(self, key: str) -> Optional[Tuple[pd.DataFrame, str]]:
+        import pyarrow.parquet as pq
+
+        path = self._path(key)
+        try:
+            table = pq.read_table(path)
+        except Exception:
+            self.misses += 1
+            return None
+        meta = table.schema.metadata or {}
+        df = table.to_pandas()
+        os.utime(path)  # LRU: marca de uso reciente
+        self.hits += 1
+        return df, meta.get(_LOG_KEY, b"").decode("utf-8")
+
+    def put(self, key: str, df: pd.DataFrame, log: str) -> bool:
+        """Guarda el fragmento. Devuelve False si Arrow no puede convertirlo.
+
+        `normalize_workbook` entrega `value` ya numérico (float64), así que los valores
+        mezclados (enteros/decimales, "-") no impiden guardar la hoja."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except Exception:
+            return False
+        meta = dict(table.schema.metadata or {})
+        meta[_LOG_KEY] = log.encode("utf-8")
+        tmp = self._path(key).with_suffix(".tmp")
+        pq.write_table(table.replace_schema_metadata(meta), tmp)
+        os.replace(tmp, self._path(key))
+        self._evict()
+        return True
+
+    def _evict(self):
+        files = [(p.stat().st_mtime, p.stat().st_size, p) for p in self.dir.glob("*.parquet")]
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
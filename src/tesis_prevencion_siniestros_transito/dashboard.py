@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""Datos para los dashboards de validación (`notebooks/validacion_web.ipynb`).
+
+`prepare_dashboard_data` lee las predicciones que escribe el notebook de modelado
+(`models/predictions_best_model/` y `models/future_predictions_2024_2025/`) y escribe
+`dashboard_data.json` con lo que los dashboards muestran al cargar:
+
+- `cube`: región x año con real, predicho, percentiles del error y % de filas con error
+  <= 20% / 50% (`aggregate_cube`);
+- `national`: los mismos agregados por año para todo el país, y `metrics` para el total;
+- `future`: las predicciones de los años proyectados;
+- `detail`: región -> archivo `dashboard_detail/<region>.json` con sus filas, que el
+  dashboard pide solo cuando se elige esa región.
+
+Las carpetas de Spark se leen completas (todos los `part-*.csv`, en paralelo) y solo si
+tienen `_SUCCESS`. El payload guarda una firma de esos archivos (`inputs`): si no
+cambiaron desde la última corrida, no se vuelve a escribir nada.
+
+Cada tabla va en formato columnar,
+
+    {"length": n, "columns": [...], "types": [...], "data": [columna, ...]}
+
+con una lista por columna (los nombres no se repiten en cada fila) y las regiones
+codificadas como diccionario + índices. Los JSON van sin espacios y con hermanos
+precomprimidos (`.gz` y, si está el paquete `brotli`, `.br`). Con `arrow=True` las
+tablas completas se escriben también como Arrow IPC (`dashboard_<tabla>.arrow`).
+"""
+import argparse
+import hashlib
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from .slugs import slug
+from .web_assets import compressed
+
+PAYLOAD_PATH = Path("dashboard_data.json")
+DETAIL_DIR = Path("dashboard_detail")
+PREDICTIONS_DIR = "predictions_best_model"
+FUTURE_DIR = "future_predictions_2024_2025"
+DECIMALS = 3  # los dashboards muestran a lo más 1 decimal
+MAX_READERS = 8
+# Subir cuando cambie el contenido del payload: invalida la firma de las corridas anteriores
+PAYLOAD_VERSION = 2
+
+PREDICTION_COLUMNS = {
+    "siniestros_total__total": "actual",
+    "prediction": "predicted",
+    "absolute_error": "abs_error",
+    "relative_error": "rel_error",
+}
+
+_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+def spark_part_files(path: Path) -> Optional[List[Path]]:
+    """`part-*.csv` de una carpeta escrita por Spark, en orden; None si la carpeta no existe.
+
+    Sin `_SUCCESS` la escritura no terminó (o falló) y se rechaza la carpeta."""
+    if not path.is_dir():
+        return None
+    if not (path / "_SUCCESS").is_file():
+        raise ValueError(f"Salida de Spark incompleta (falta _SUCCESS): {path}")
+    return sorted(path.glob("part-*.csv"))
+
+def read_spark_csv(path: Path) -> Optional[pd.DataFrame]:
+    """Todos los part files de la carpeta en un DataFrame; None si la carpeta no existe o
+    no tiene part files con datos (p. ej. solo `_SUCCESS` y los `.crc`).
+
+    Cada archivo se lee con el lector CSV de Arrow en su propio hilo; los tipos se
+    unifican al concatenar (un part vacío solo trae el encabezado)."""
+    files = spark_part_files(path)
+    if files is None:
+        return None
+    files = [f for f in files if f.stat().st_size > 0]  # particiones vacías sin encabezado
+    if not files:
+        return None
+    with ThreadPoolExecutor(max_workers=min(MAX_READERS, len(files))) as pool:
+        tables = list(pool.map(lambda f: pa_csv.read_csv(str(f)), files))
+    return pa.concat_tables(tables, promote_options="permissive").to_pandas()
+
+def inputs_signature(models_dir: str = "models") -> str:
+    """Hash de nombre, tamaño y mtime de los part files y `_SUCCESS` de ambas carpetas."""
+    h = hashlib.sha1(str(PAYLOAD_VERSION).encode())
+    for name in (PREDICTIONS_DIR, FUTURE_DIR):
+        path = Path(models_dir) / name
+        files = spark_part_files(path)
+        for f in ([] if files is None else files + [path / "_SUCCESS"]):
+            st = f.stat()
+            h.update(f"{name}/{f.name}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return h.hexdigest()
+
+def load_predictions(models_dir: str = "models") -> Dict[str, pd.DataFrame]:
+    """Tablas `predictions` (validación, con `error_pct`) y `future` (años proyectados)."""
+    models_dir = Path(models_dir)
+    tables = {}
+    df = read_spark_csv(models_dir / PREDICTIONS_DIR)
+    if df is not None:
+        df = df.rename(columns=PREDICTION_COLUMNS)
+        if "rel_error" in df.columns:
+            df["error_pct"] = df["rel_error"] * 100
+        elif {"actual", "predicted"} <= set(df.columns):
+            # como `relative_error` del notebook: nulo si el real es 0 (evita inf en el JSON)
+            df["error_pct"] = ((df["predicted"] - df["actual"]).abs() / df["actual"] * 100).where(df["actual"] > 0)
+        else:
+            df["error_pct"] = 0.0
+        tables["predictions"] = df
+    future = read_spark_csv(models_dir / FUTURE_DIR)
+    if future is not None:
+        tables["future"] = future
+    return tables
+
+def _within(err: pd.Series, pct: float) -> pd.Series:
+    """100 si el error está dentro de `pct`, 0 si no, nulo sin error (real 0)."""
+    return ((err <= pct) * 100.0).where(err.notna())
+
+def dashboard_metrics(predictions: pd.DataFrame) -> Dict[str, Optional[float]]:
+    """Métricas globales; las filas sin error no cuentan (null si no queda ninguna)."""
+    err = predictions["error_pct"].dropna()
+
+    def value(x):
+        return None if pd.isna(x) else float(x)
+
+    return {
+        "total_regions": int(predictions["region"].nunique()),
+        "mean_error": value(err.mean()),
+        "median_error": value(err.median()),
+        "accuracy": value(100 - err.mean()),
+        "within_20pct": value((err <= 20).mean() * 100),
+        "within_50pct": value((err <= 50).mean() * 100),
+    }
+
+def _error_stats(predictions: pd.DataFrame, keys) -> pd.DataFrame:
+    err = predictions["error_pct"]
+    groups = predictions.assign(within_20pct=_within(err, 20), within_50pct=_within(err, 50)) \
+        .groupby(keys, sort=True)
+    stats = groups.agg(n=("error_pct", "size"), actual=("actual", "sum"), predicted=("predicted", "sum"),
+                       error_mean=("error_pct", "mean"), error_p50=("error_pct", "median"),
+                       within_20pct=("within_20pct", "mean"), within_50pct=("within_50pct", "mean"))
+    stats.insert(5, "error_p90", groups["error_pct"].quantile(0.9))
+    return stats.reset_index()
+
+def aggregate_cube(predictions: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """`cube` (region x year) y `national` (year) con sumas de real/predicho y el error."""
+    return {"cube": _error_stats(predictions, ["region", "year"]), "national": _error_stats(predictions, "year")}
+
+def _column(s: pd.Series, decimals: int):
+    """(tipo, valores) de una columna; nulos como null."""
+    if pd.api.types.is_bool_dtype(s):
+        return "bool", s.tolist()
+    if pd.api.types.is_integer_dtype(s) and s.notna().all():
+        kind = "int32" if s.abs().max() < 2 ** 31 else "float64"
+        return kind, s.astype(np.int64).tolist()
+    if pd.api.types.is_numeric_dtype(s):
+        s = s.astype(float).round(decimals)
+        return "float64", s.astype(object).where(s.notna(), None).tolist()
+    codes, uniques = pd.factorize(s.astype("string"), use_na_sentinel=True)
+    return "dictionary", {"dictionary": uniques.astype(object).tolist(),
+                          "indices": [None if c < 0 else c for c in codes.tolist()]}
+
+def columnar(df: pd.DataFrame, decimals: int = DECIMALS) -> dict:
+    """Tabla en el formato columnar de `dashboard_data.json`."""
+    types, data = [], []
+    for name in df.columns:
+        kind, values = _column(df[name], decimals)
+        types.append(kind)
+        data.append(values)
+    return {"length": len(df), "columns": [str(c) for c in df.columns], "types": types, "data": data}
+
+def write_payload(payload: dict, path: str) -> List[Path]:
+    """JSON compacto más sus hermanos comprimidos; devuelve los archivos escritos."""
+    path = Path(path)
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+    written = [path]
+    path.write_bytes(body)
+    for encoding, data in compressed(body).items():
+        target = path.with_name(path.name + _SUFFIXES[encoding])
+        target.write_bytes(data)
+        written.append(target)
+    return written
+
+def write_detail(predictions: pd.DataFrame, out_dir: str, decimals: int = DECIMALS) -> Dict[str, str]:
+    """Un JSON columnar por región en `DETAIL_DIR`; devuelve región -> ruta relativa.
+
+    Regiones con el mismo slug ("SAN MARTÍN" y "SAN MARTIN") reciben un sufijo
+    `_2`, `_3`... en orden alfabético. Se borran los archivos de regiones que ya no están."""
+    detail_dir = Path(out_dir) / DETAIL_DIR
+    detail_dir.mkdir(parents=True, exist_ok=True)
+    paths, written, used = {}, set(), set()
+    for region, rows in predictions.groupby("region", sort=True):
+        stem = base = slug(region)
+        n = 1
+        while stem in used:
+            n += 1
+            stem = f"{base}_{n}"
+        used.add(stem)
+        name = DETAIL_DIR / f"{stem}.json"
+        written.update(write_payload(columnar(rows.reset_index(drop=True), decimals), Path(out_dir) / name))
+        paths[str(region)] = name.as_posix()
+    for stale in set(detail_dir.iterdir()) - written:
+        stale.unlink()
+    return paths
+
+def write_arrow(tables: Dict[str, pd.DataFrame], out_dir: str) -> List[Path]:
+    """Cada tabla como Arrow IPC sin comprimir (legible por apache-arrow en JS)."""
+    written = []
+    for name, df in tables.items():
+        df = df.astype({c: "category" for c in df.columns if df[c].dtype == object})
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        path = Path(out_dir) / f"dashboard_{name}.arrow"
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        written.append(path)
+    return written
+
+def _up_to_date(out_dir: Path, inputs: str, arrow: bool) -> Optional[dict]:
+    """Payload de la corrida anterior si se armó con las mismas entradas y sus archivos siguen ahí."""
+    try:
+        payload = json.loads((out_dir / PAYLOAD_PATH).read_bytes())
+    except (OSError, ValueError):
+        return None
+    files = [out_dir / f for f in payload.get("detail", {}).values()]
+    if arrow:
+        files += [out_dir / f"dashboard_{name}.arrow" for name in ("predictions", "future")]
+    if payload.get("inputs") != inputs or not all(f.is_file() for f in files):
+        return None
+    return payload
+
+def prepare_dashboard_data(models_dir: str = "models", out_dir: str = ".", arrow: bool = False,
+                           decimals: int = DECIMALS, force: bool = False) -> dict:
+    """Escribe `dashboard_data.json` y el detalle por región (+ .gz/.br y, con `arrow`, los
+    .arrow) y devuelve el payload.
+
+    Si los part files no cambiaron desde la última corrida (misma firma, mismos
+    `decimals`/`arrow`) devuelve el payload existente sin reescribir; `force` lo evita."""
+    out_dir = Path(out_dir)
+    inputs = hashlib.sha1(f"{inputs_signature(models_dir)}:{decimals}:{arrow}".encode()).hexdigest()
+    if not force:
+        previous = _up_to_date(out_dir, inputs, arrow)
+        if previous is not None:
+            return previous
+    tables = load_predictions(models_dir)
+    predictions = tables.get("predictions")
+    if predictions is None:
+        predictions = pd.DataFrame({"region": [], "year": [], "actual": [], "predicted": [], "error_pct": []})
+    out_dir.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "format": "cube",
+        "inputs": inputs,
+        **{name: columnar(df, decimals) for name, df in aggregate_cube(predictions).items()},
+        "future": columnar(tables.get("future", pd.DataFrame()), decimals),
+        "metrics": dashboard_metrics(predictions) if len(predictions) else {},
+        "regions": predictions["region"].unique().tolist(),
+        "detail": write_detail(predictions, out_dir, decimals),
+    }
+    write_payload(payload, out_dir / PAYLOAD_PATH)
+    if arrow:
+        write_arrow({name: tables.get(name, pd.DataFrame()) for name in ("predictions", "future")}, out_dir)
+    return payload
+
+def main():
+    ap = argparse.ArgumentParser(description="Prepara dashboard_data.json para los dashboards de validación.")
+    ap.add_argument("--models", default="models", help="Carpeta con las predicciones del notebook.")
+    ap.add_argument("--out", default=".", help="Carpeta de salida (la de dashboard_enhanced.html).")
+    ap.add_argument("--arrow", action="store_true", help="Escribir también dashboard_<tabla>.arrow (Arrow IPC).")
+    ap.add_argument("--force", action="store_true", help="Reescribir aunque las predicciones no hayan cambiado.")
+    args = ap.parse_args()
+
+    try:
+        payload = prepare_dashboard_data(args.models, args.out, arrow=args.arrow, force=args.force)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Dashboard data prepared: {payload['cube']['length']} region-year cells")
+    print(f"Regions: {len(payload['regions'])}")
+    print(f"Mean accuracy: {payload['metrics'].get('accuracy') or 0:.1f}%")
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""Dataset Parquet particionado (Hive: metric=.../year=...) de la tabla larga.
+
+Los consumidores casi siempre filtran por una métrica o un rango de años; con
+particiones solo se leen (y decodifican) los archivos que cumplen el filtro.
+`read_long` sirve igual para el Parquet de un solo archivo: ahí el filtro usa las
+estadísticas min/max de cada row group.
+
+`summarize_long` verifica la tabla sin leerla: filas, esquema y rangos salen de los
+footers Parquet y de las claves de partición.
+"""
+import shutil
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .schema import LONG_COLUMNS, schema_problems
+
+PARTITION_COLS = ("metric", "year")
+
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([("metric", pa.string()), ("year", pa.int16())]), flavor="hive")
+
+def write_long_dataset(df: pd.DataFrame, root: str, max_rows_per_group: Optional[int] = None):
+    """Escribe la tabla larga como dataset particionado por métrica y año.
+
+    Las carpetas `metric=...` de una escritura anterior se borran antes (el resto de
+    `root` no se toca), así no quedan particiones que los datos nuevos ya no traen.
+    `max_rows_per_group` controla el tamaño de los row groups (por defecto el de pyarrow).
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Las columnas de partición viajan en la ruta, no dentro de los archivos
+    table = table.set_column(table.schema.get_field_index("metric"), "metric",
+                             table.column("metric").cast(pa.string()))
+    kwargs = {}
+    if max_rows_per_group:
+        kwargs.update(max_rows_per_group=max_rows_per_group,
+                      min_rows_per_group=max_rows_per_group,
+                      max_rows_per_file=max(max_rows_per_group, 1 << 20))
+    if Path(root).is_dir():
+        for part in Path(root).glob("metric=*"):
+            shutil.rmtree(part)
+    ds.write_dataset(
+        table, root, format="parquet",
+        partitioning=_partitioning(),
+        basename_template="part-{i}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        file_options=ds.ParquetFileFormat().make_write_options(use_dictionary=True, write_statistics=True),
+        **kwargs,
+    )
+
+def _filter(metrics: Optional[Iterable[str]], years: Optional[Tuple[Optional[int], Optional[int]]]):
+    import pyarrow.dataset as ds
+
+    expr = None
+    def _and(e):
+        return e if expr is None else expr & e
+    if metrics:
+        expr = _and(ds.field("metric").isin(list(metrics)))
+    if years:
+        lo, hi = years
+        if lo is not None:
+            expr = _and(ds.field("year") >= lo)
+        if hi is not None:
+            expr = _and(ds.field("year") <= hi)
+    return expr
+
+def _open(path: str):
+    import pyarrow.dataset as ds
+
+    if Path(path).is_dir() and any(p.name.startswith("metric=") for p in Path(path).iterdir()):
+        return ds.dataset(path, format="parquet", partitioning=_partitioning())
+    return ds.dataset(path, format="parquet")
+
+def read_long(path: str, metrics: Optional[Iterable[str]] = None,
+              years: Optional[Tuple[Optional[int], Optional[int]]] = None,
+              columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Lee la tabla larga (archivo, carpeta de Spark o dataset particionado) filtrando por métrica/años."""
+    dataset = _open(path)
+    cols = list(columns) if columns else [c for c in LONG_COLUMNS if c in dataset.schema.names]
+    df = dataset.to_table(columns=cols, filter=_filter(metrics, years)).to_pandas()
+    if "metric" in df.columns and not isinstance(df["metric"].dtype, pd.CategoricalDtype):
+        df["metric"] = df["metric"].astype("category")
+    return df
+
+def head_long(path: str, n: int = 10, metrics: Optional[Iterable[str]] = None,
+              years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> pd.DataFrame:
+    """Primeras `n` filas que cumplen el filtro; solo se leen los row groups necesarios."""
+    return _open(path).head(n, filter=_filter(metrics, years)).to_pandas()
+
+class LongSummary(NamedTuple):
+    rows: int
+    schema: object  # pa.Schema
+    years: Tuple[Optional[int], Optional[int]]
+    values: Tuple[Optional[float], Optional[float]]
+    metrics: Dict[str, int]  # filas por métrica, de mayor a menor
+    problems: List[str]  # diferencias con el esquema esperado (`schema.schema_problems`)
+
+def _metric_counts(dataset, expr) -> Counter:
+    """Filas por métrica leyendo solo la columna `metric`, sin decodificar el diccionario."""
+    import pyarrow.compute as pc
+
+    counts = Counter()
+    for chunk in dataset.to_table(columns=["metric"], filter=expr).column("metric").chunks:
+        if hasattr(chunk, "dictionary"):
+            n = np.bincount(chunk.indices.drop_null().to_numpy(), minlength=len(chunk.dictionary))
+            counts.update({k: int(c) for k, c in zip(chunk.dictionary.to_pylist(), n) if c})
+        else:
+            counts.update({d["values"]: d["counts"] for d in pc.value_counts(chunk.drop_null()).to_pylist()})
+    return counts
+
+def summarize_long(path: str, metrics: Optional[Iterable[str]] = None,
+                   years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> LongSummary:
+    """Resumen de la tabla larga sin decodificar páginas de datos.
+
+    Filas, esquema y min/max de `year`/`value` salen de los footers (estadísticas por
+    row group) y de las claves de partición; con filtros, de los row groups que pueden
+    cumplirlos. Las filas por métrica, en el dataset particionado, también; en un solo
+    archivo se lee únicamente la columna `metric` (índices del diccionario).
+    """
+    import pyarrow.dataset as ds
+
+    dataset = _open(path)
+    expr = _filter(metrics, years)
+    bounds = {"year": [None, None], "value": [None, None]}
+    rows, counts, by_partition = 0, Counter(), True
+    for fragment in dataset.get_fragments(filter=expr):
+        keys = ds.get_partition_keys(fragment.partition_expression)
+        by_partition &= "metric" in keys
+        meta = fragment.metadata
+        ids = range(meta.num_row_groups) if expr is None else \
+            [rg.id for group in fragment.split_by_row_group(filter=expr, schema=dataset.schema)
+             for rg in group.row_groups]
+        # Solo las columnas con rango; las estadísticas de las de texto no se tocan
+        cols = {c: meta.schema.names.index(c) for c in bounds if c in meta.schema.names}
+        for i in ids:
+            group = meta.row_group(i)
+            ranges = {"year": (keys["year"], keys["year"])} if "year" in keys else {}
+            for c, j in cols.items():
+                st = group.column(j).statistics
+                if st is not None and st.has_min_max:
+                    ranges[c] = (st.min, st.max)
+            for c, (lo, hi) in ranges.items():
+                b0, b1 = bounds[c]
+                bounds[c] = [lo if b0 is None else min(b0, lo), hi if b1 is None else max(b1, hi)]
+            rows += group.num_rows
+            counts[keys.get("metric")] += group.num_rows
+    if not by_partition:
+        # Un solo archivo: los row groups mezclan métricas
+        counts = _metric_counts(dataset, expr) if "metric" in dataset.schema.names else Counter()
+        if expr is not None:
+            rows = dataset.count_rows(filter=expr)
+    if years:
+        lo, hi = years
+        y0, y1 = bounds["year"]
+        bounds["year"] = [y0 if lo is None or y0 is None else max(lo, y0),
+                          y1 if hi is None or y1 is None else min(hi, y1)]
+    return LongSummary(rows, dataset.schema, tuple(bounds["year"]), tuple(bounds["value"]),
+                       dict(counts.most_common()), schema_problems(dataset.schema))
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Capa gold en memoria para inferencia en línea.
+
+Al cargar se arma una sola vez la matriz de features de todas las filas gold en el
+orden del artefacto (`ModelArtifact.design_matrix`) y un índice (region, year) ->
+fila. Armar el vector de una petición es un acceso por diccionario y una copia de
+fila; no se lee Parquet ni se crea un DataFrame por petición.
+
+`refresh()` vuelve a cargar si cambió el archivo/carpeta gold (nuevo snapshot) o, con
+`model_path`, el artefacto del modelo; el estado se reemplaza de una vez, así que las
+peticiones en curso siguen viendo una versión completa. Si el snapshot nuevo no se puede
+leer (borrado o a medio escribir durante un overwrite de Spark o `write_layers`), se
+registra el error, se sigue sirviendo el estado anterior y se reintenta en la próxima revisión.
+"""
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .model_artifact import ModelArtifact, load_artifact, projected_features
+
+log = logging.getLogger(__name__)
+
+class _State(NamedTuple):
+    artifact: ModelArtifact
+    col: Dict[str, int]  # feature -> columna de X
+    X: np.ndarray  # filas gold x features del artefacto (sin escalar)
+    rows: Dict[Tuple[str, int], int]
+    last: Dict[str, Tuple[int, int]]  # región -> (fila, año) del último año
+    regions: List[str]
+    signature: tuple
+    model_signature: tuple
+
+def _signature(path: Path) -> tuple:
+    """mtime/tamaño del Parquet (o de sus archivos, si es una carpeta de Spark)."""
+    files = sorted(path.rglob("*.parquet")) if path.is_dir() else [path]
+    return tuple((str(f), f.stat().st_mtime_ns, f.stat().st_size) for f in files)
+
+class FeatureStore:
+    def __init__(self, path: str, artifact: ModelArtifact, check_every: float = 5.0,
+                 model_path: Optional[str] = None):
+        self.path = Path(path)
+        self.model_path = Path(model_path) if model_path else None
+        self.check_every = check_every
+        self._checked = 0.0
+        self._state = self._load(artifact)
+
+    def _load(self, artifact: ModelArtifact) -> _State:
+        signature = _signature(self.path)
+        model_signature = _signature(self.model_path) if self.model_path else ()
+        gold = pd.read_parquet(self.path)
+        years = gold["year"].to_numpy(dtype=np.int64)
+        regions = gold["region"].astype(str).tolist()
+        rows = {(r, int(y)): i for i, (r, y) in enumerate(zip(regions, years))}
+        last = {}
+        for i, (r, y) in enumerate(zip(regions, years)):
+            if r not in last or y > last[r][1]:
+                last[r] = (i, int(y))
+        col = {f: j for j, f in enumerate(artifact.features)}
+        return _State(artifact, col, artifact.design_matrix(gold), rows, last, sorted(last), signature,
+                      model_signature)
+
+    def reload(self, artifact: Optional[ModelArtifact] = None):
+        """Recarga la capa gold (y opcionalmente cambia de artefacto)."""
+        self._state = self._load(artifact or self._state.artifact)
+
+    def refresh(self) -> bool:
+        """Recarga si cambió el snapshot gold o el artefacto; lo revisa a lo más cada
+        `check_every` segundos. Devuelve False (y conserva el estado) si la recarga falla."""
+        now = time.monotonic()
+        if now - self._checked < self.check_every:
+            return False
+        self._checked = now
+        state = self._state
+        try:
+            model_signature = _signature(self.model_path) if self.model_path else ()
+            if model_signature != state.model_signature:
+                self.reload(load_artifact(str(self.model_path)))
+            elif _signature(self.path) != state.signature:
+                self.reload()
+            else:
+                return False
+        except Exception as e:  # snapshot incompleto: se mantiene el último estado bueno
+            log.warning("No se pudo recargar %s (%s: %s); se mantiene el estado anterior",
+                        self.path, type(e).__name__, e)
+            return False
+        return True
+
+    @property
+    def artifact(self) -> ModelArtifact:
+        return self._state.artifact
+
+    @property
+    def regions(self) -> List[str]:
+        return self._state.regions
+
+    @property
+    def version(self) -> tuple:
+        """Cambia con cada snapshot gold o artefacto cargado."""
+        return self._state.signature, self._state.model_signature
+
+    def matrix(self, regions: Sequence[str], years: Sequence[int],
+               overrides: Optional[Sequence[Optional[Dict[str, float]]]] = None) -> np.ndarray:
+        """Features sin escalar para cada (region, year), listas para `ModelArtifact.predict`.
+
+        Mismas reglas que `model_artifact.request_frame`: la fila gold del año o, para
+        años posteriores al último, la proyección del paso 13.
+        """
+        return self._matrix(self._state, regions, years, overrides)
+
+    def predict_interval(self, regions: Sequence[str], years: Sequence[int],
+                         overrides: Optional[Sequence[Optional[Dict[str, float]]]] = None,
+                         coverage: float = 0.8) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """`ModelArtifact.predict_interval` con el artefacto del mismo estado que la matriz."""
+        state = self._state
+        return state.artifact.predict_interval(self._matrix(state, regions, years, overrides), coverage)
+
+    @staticmethod
+    def _matrix(state: _State, regions, years, overrides) -> np.ndarray:
+        X = np.empty((len(regions), state.X.shape[1]))
+        for i, (region, year) in enumerate(zip(regions, years)):
+            row = state.rows.get((region, year))
+            if row is not None:
+                X[i] = state.X[row]
+                continue
+            if region not in state.last:
+                raise ValueError(f"Región desconocida: {region}")
+            row, last_year = state.last[region]
+            if year < last_year:
+                raise ValueError(f"No hay datos de {region} para {year}")
+            X[i] = state.X[row]
+            for name, value in projected_features(year).items():
+                if name in state.col:
+                    X[i, state.col[name]] = value
+        for i, values in enumerate(overrides or []):
+            for name, value in (values or {}).items():
+                if name not in state.col or name == state.artifact.index_col:
+                    raise ValueError(f"Feature desconocida: {name}")
+                X[i, state.col[name]] = value
+        return X
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Lags, crecimiento y ventanas móviles por región en una sola pasada vectorizada.
+
+Se ordena una vez por (región, año); cada región queda como un segmento contiguo
+y todas las features salen de una matriz de rezagos `n x profundidad` construida
+con desplazamientos dentro del segmento (NumPy, sin un sort/shuffle por ventana).
+Los rezagos son por fila, como `lag` sobre `Window.partitionBy(...).orderBy(...)`:
+si falta un año, el rezago 1 es el año anterior disponible.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+def segment_offsets(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Para claves ya ordenadas: (inicio de cada segmento, posición de cada fila en su segmento)."""
+    n = len(keys)
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = keys[1:] != keys[:-1]
+    starts = np.flatnonzero(is_start)
+    seg = np.cumsum(is_start) - 1
+    return starts, np.arange(n) - starts[seg]
+
+def lag_matrix(values: np.ndarray, pos: np.ndarray, depth: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """Columna k-1 = valor k filas atrás dentro del mismo segmento (NaN si no existe).
+
+    Con `rows` (índices) solo se arman esas filas; los rezagos se leen igual de `values`.
+    """
+    rows = np.arange(len(values)) if rows is None else rows
+    out = np.full((len(rows), depth), np.nan)
+    for k in range(1, depth + 1):
+        ok = pos[rows] >= k
+        out[ok, k - 1] = values[rows[ok] - k]
+    return out
+
+def lag_feature_names(lags: Sequence[int] = (1, 2, 3), windows: Sequence[int] = (3,), prefix: str = "y") -> List[str]:
+    names = [f"{prefix}_lag{k}" for k in lags] + [f"growth_{prefix}"]
+    for w in windows:
+        names += [f"rolling_avg_{w}y", f"rolling_std_{w}y"]
+    return names
+
+def lag_feature_arrays(y: np.ndarray, pos: np.ndarray, lags: Sequence[int] = (1, 2, 3),
+                       windows: Sequence[int] = (3,), prefix: str = "y",
+                       rows: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """Features de `build_lag_features` sobre arreglos ya ordenados por (grupo, orden).
+
+    `pos` es la posición de cada fila en su segmento (`segment_offsets`); con `rows`
+    se calculan solo esas filas.
+    """
+    rows = np.arange(len(y)) if rows is None else rows
+    depth = max([1, *lags, *windows])
+    m = lag_matrix(y, pos, depth, rows)
+    pos = pos[rows]
+
+    out = {f"{prefix}_lag{k}": m[:, k - 1] for k in lags}
+    lag1 = m[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[f"growth_{prefix}"] = np.where(lag1 > 0, (y[rows] - lag1) / lag1, 0.0)
+        for w in windows:
+            # de la fila más antigua a la más reciente, como el frame rowsBetween(-w, -1)
+            win = m[:, w - 1::-1]
+            count = np.minimum(pos, w)
+            total = np.where(np.isnan(win), 0.0, win).sum(axis=1)
+            mean = np.where(count > 0, total / count, np.nan)
+            dev = np.where(np.isnan(win), 0.0, win - mean[:, None])
+            var = (dev * dev).sum(axis=1) / (count - 1)
+            out[f"rolling_avg_{w}y"] = mean
+            out[f"rolling_std_{w}y"] = np.where(count > 1, np.sqrt(var), np.nan)
+    return out
+
+def build_lag_features(df: pd.DataFrame, value_col: str, group_col: str = "region", order_col: str = "year",
+                       lags: Sequence[int] = (1, 2, 3), windows: Sequence[int] = (3,),
+                       prefix: str = "y") -> pd.DataFrame:
+    """Devuelve `df` ordenado por (group_col, order_col) con las features agregadas.
+
+    - `{prefix}_lag{k}` para cada k en `lags`;
+    - `growth_{prefix}`: (valor - lag1) / lag1 si lag1 > 0, si no 0;
+    - `rolling_avg_{w}y` / `rolling_std_{w}y`: media y desviación muestral de las `w`
+      filas previas (sin la actual); NaN sin historia (la desviación necesita 2 filas).
+    """
+    codes, _ = pd.factorize(df[group_col], sort=True)
+    order = np.lexsort((df[order_col].to_numpy(), codes))
+    df = df.take(order).reset_index(drop=True)
+    _, pos = segment_offsets(codes[order])
+    out = lag_feature_arrays(df[value_col].to_numpy(dtype=np.float64), pos, lags, windows, prefix)
+    return pd.concat([df, pd.DataFrame(out, index=df.index)], axis=1)
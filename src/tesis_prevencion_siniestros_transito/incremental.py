@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Actualización incremental de la capa gold (p. ej. cuando llega un año nuevo).
+
+Junto a la capa gold se guarda un Parquet de estado con un hash por clave
+(year, region) del contenido silver que la generó. En la siguiente corrida solo se
+recalculan las claves nuevas o cambiadas; de las demás se reutiliza la fila gold.
+Lo que depende de otras filas se actualiza de forma acotada:
+
+- lags/ventanas: las filas cambiadas y las `profundidad` filas siguientes de su región
+  (también las que siguen a una clave eliminada);
+- estadísticos por región (`region_*_total`, `region_size_category`): solo las regiones
+  con alguna clave cambiada o eliminada.
+
+Si cambia el conjunto de columnas del tablón ancho, o los lags/ventanas pedidos, no hay
+forma segura de reutilizar filas y se recalcula todo.
+"""
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .features import lag_feature_arrays, lag_feature_names, segment_offsets
+from .pipeline import (GOLD_PATH, LAGS, TOTAL_COL, WINDOWS, _resolve_bronze, feature_layer, gold_columns,
+                       gold_layer, recover_and_proportions, region_features, silver_layer, write_layers)
+
+STATE_PATH = Path("gold_local") / "siniestros_gold_claves.parquet"
+KEY_COLS = ["year", "region"]
+
+def key_hashes(silver: pd.DataFrame) -> pd.DataFrame:
+    """Hash por (year, region) del contenido silver (no depende del orden de las filas)."""
+    row_hash = pd.util.hash_pandas_object(silver[["metric", "dim_name", "dim_value", "value"]],
+                                          index=False).to_numpy()
+    codes, keys = pd.factorize(pd.MultiIndex.from_frame(silver[KEY_COLS]))
+    sums = np.zeros(len(keys), dtype=np.uint64)
+    np.add.at(sums, codes, row_hash)  # suma módulo 2**64
+    return pd.DataFrame({"year": np.asarray(keys.get_level_values(0), dtype="int32"),
+                         "region": keys.get_level_values(1), "hash": sums})
+
+def write_state(workdir: Path, hashes: pd.DataFrame, wide_columns: List[str],
+                lags: Sequence[int], windows: Sequence[int]):
+    """Guarda los hashes por clave; columnas del tablón y lags/ventanas van en los metadatos."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(hashes, preserve_index=False)
+    meta = dict(table.schema.metadata or {})
+    meta[b"tpst.wide_columns"] = json.dumps(wide_columns).encode()
+    meta[b"tpst.lags"] = json.dumps(list(lags)).encode()
+    meta[b"tpst.windows"] = json.dumps(list(windows)).encode()
+    (workdir / STATE_PATH).parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table.replace_schema_metadata(meta), workdir / STATE_PATH)
+
+def read_state(workdir: Path) -> Optional[Tuple[pd.DataFrame, Dict[str, list]]]:
+    import pyarrow.parquet as pq
+
+    path = workdir / STATE_PATH
+    if not path.exists() or not (workdir / GOLD_PATH).exists():
+        return None
+    table = pq.read_table(path)
+    meta = {k.decode()[len("tpst."):]: json.loads(v) for k, v in (table.schema.metadata or {}).items()
+            if k.startswith(b"tpst.")}
+    return table.to_pandas(), meta
+
+def _sorted_by_region(df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Mismo orden (region, year) que `build_lag_features`; devuelve también el código de región."""
+    codes, _ = pd.factorize(df["region"], sort=True)
+    order = np.lexsort((df["year"].to_numpy(), codes))
+    return df.take(order).reset_index(drop=True), codes[order]
+
+def _dirty_rows(marks: np.ndarray, seg_keys: np.ndarray, depth: int) -> np.ndarray:
+    """Filas marcadas y hasta `depth` filas siguientes de la misma región."""
+    dirty = marks.copy()
+    for j in range(1, depth + 1):
+        prev = np.flatnonzero(marks[:-j]) if j < len(marks) else np.zeros(0, dtype=np.int64)
+        same = seg_keys[prev + j] == seg_keys[prev]
+        dirty[prev[same] + j] = True
+    return dirty
+
+def update_gold(source: Optional[str], workdir: str = ".", lags: Sequence[int] = LAGS,
+                windows: Sequence[int] = WINDOWS) -> Dict[str, object]:
+    """Actualiza bronze/silver y la capa gold recalculando solo lo que cambió.
+
+    Devuelve las capas como `run_pipeline` ("wide" es solo el tablón de las claves
+    recalculadas) y "cambios" con el resumen de la actualización.
+    """
+    workdir = Path(workdir)
+    bronze = _resolve_bronze(source, workdir)
+    silver = silver_layer(bronze)
+    hashes = key_hashes(silver)
+    prev = read_state(workdir)
+
+    def full(reason: str):
+        wide = gold_layer(silver)
+        features = feature_layer(wide, lags, windows)
+        write_layers(workdir, {"bronze": bronze, "silver": silver, "features": features})
+        write_state(workdir, hashes, list(wide.columns[2:]), lags, windows)
+        cambios = {"modo": "completo", "motivo": reason, "filas_recalculadas": len(features)}
+        return {"bronze": bronze, "silver": silver, "wide": wide, "features": features, "cambios": cambios}
+
+    if prev is None:
+        return full("sin capa gold previa")
+    old_hashes, meta = prev
+    if meta.get("lags") != list(lags) or meta.get("windows") != list(windows):
+        return full("cambiaron los lags o ventanas")
+
+    both = old_hashes.merge(hashes, on=KEY_COLS, how="outer", suffixes=("_old", ""), indicator=True)
+    changed = both.loc[(both["_merge"] != "left_only") & (both["hash"] != both["hash_old"]), KEY_COLS]
+    removed = both.loc[both["_merge"] == "left_only", KEY_COLS]
+    if changed.empty and removed.empty:
+        write_layers(workdir, {"bronze": bronze, "silver": silver})
+        cambios = {"modo": "sin cambios", "filas_recalculadas": 0}
+        return {"bronze": bronze, "silver": silver, "wide": None,
+                "features": pd.read_parquet(workdir / GOLD_PATH), "cambios": cambios}
+
+    # Columnas del tablón con todas las claves: si aparece o desaparece una categoría
+    # cambian las columnas (y proporciones) de todas las filas
+    wide_columns = meta["wide_columns"]
+    current = gold_columns(silver)
+    new_cols = sorted(set(current) - set(wide_columns))
+    if new_cols:
+        return full(f"columnas nuevas en el tablón ancho: {', '.join(new_cols[:5])}")
+    gone = sorted(set(wide_columns) - set(current))
+    if gone:
+        return full(f"columnas que ya no están en el tablón ancho: {', '.join(gone[:5])}")
+    in_delta = pd.MultiIndex.from_frame(silver[KEY_COLS]).isin(pd.MultiIndex.from_frame(changed))
+    delta_wide = gold_layer(silver[in_delta]) if in_delta.any() else pd.DataFrame(columns=KEY_COLS)
+    delta_wide = (delta_wide.reindex(columns=KEY_COLS + wide_columns, fill_value=0.0)
+                  .astype({"year": "int32", **{c: "float64" for c in wide_columns}}))
+
+    old = pd.read_parquet(workdir / GOLD_PATH)
+    expected = list(feature_layer(delta_wide.iloc[:0], lags, windows).columns)
+    if list(old.columns) != expected:
+        return full("la capa gold previa tiene otras columnas")
+
+    # Filas propias (paso 4) solo para las claves cambiadas; el resto de la región se reutiliza
+    delta = recover_and_proportions(delta_wide)
+    temporal_cols = lag_feature_names(lags, windows)
+    affected = set(changed["region"]) | set(removed["region"])
+    touched = pd.MultiIndex.from_frame(old[KEY_COLS]).isin(
+        pd.MultiIndex.from_frame(pd.concat([changed, removed])))
+    in_affected = old["region"].isin(affected).to_numpy()
+    keep = old.loc[in_affected & ~touched, list(delta.columns) + temporal_cols]
+    rows, seg_keys = _sorted_by_region(pd.concat(
+        [keep.assign(_nuevo=False), delta.assign(_nuevo=True)], ignore_index=True))
+
+    # Lags/ventanas: desde cada fila nueva o cambiada y desde la primera fila que sigue a
+    # una clave eliminada, hasta `profundidad` filas después dentro de la región
+    marks = rows.pop("_nuevo").to_numpy(dtype=bool)
+    for year, region in removed.itertuples(index=False):
+        after = np.flatnonzero((rows["region"] == region).to_numpy() & (rows["year"] > year).to_numpy())
+        if len(after):
+            marks[after[0]] = True
+    dirty = np.flatnonzero(_dirty_rows(marks, seg_keys, max([1, *lags, *windows])))
+    _, pos = segment_offsets(seg_keys)
+    arrays = lag_feature_arrays(rows[TOTAL_COL].to_numpy(dtype=np.float64), pos, lags, windows, rows=dirty)
+    for c in temporal_cols:
+        col = rows[c].to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+        col[dirty] = arrays[c]
+        rows[c] = col
+
+    # Estadísticos por región: solo regiones afectadas (usan todas sus filas)
+    updated = region_features(rows)[expected]
+    features, _ = _sorted_by_region(pd.concat([old[~in_affected], updated], ignore_index=True))
+    features = features.astype(old.dtypes.to_dict())
+    write_layers(workdir, {"bronze": bronze, "silver": silver, "features": features})
+    write_state(workdir, hashes, wide_columns, lags, windows)
+    cambios = {"modo": "incremental", "claves_nuevas_o_cambiadas": len(changed),
+               "claves_eliminadas": len(removed), "filas_recalculadas": len(dirty),
+               "regiones_afectadas": len(affected)}
+    return {"bronze": bronze, "silver": silver, "wide": delta_wide, "features": features, "cambios": cambios}
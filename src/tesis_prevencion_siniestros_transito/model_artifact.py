@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""Artefacto compacto del mejor modelo para predecir sin Spark.
+
+Un `.npz` con todo lo que hace falta para puntuar en el mismo proceso (NumPy):
+
+- orden de las features del `VectorAssembler` (`feature_cols + ["region_size_idx"]`),
+  etiquetas del `StringIndexer` y escala del `StandardScaler` (withMean=False);
+- el modelo: árboles aplanados (feature, umbral, hijos, valor por nodo) y su peso,
+  o coeficientes + intercepto + link de un GLM;
+- si el modelo se entrenó sobre `log_total` (la salida pasa por `expm1`).
+
+"Separate_Lima_Model" guarda dos sub-modelos ("default" y "lima") y cada fila usa
+el que corresponde a su `is_lima`. `from_spark` exporta los modelos de Spark ML del
+notebook; cargar y predecir solo necesita NumPy/pandas.
+"""
+import json
+import tempfile
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .pipeline import TOTAL_COL
+
+ROUTE_COL = "is_lima"
+COVID_YEARS = (2020, 2021)
+
+_LINKS = {
+    "identity": lambda eta: eta,
+    "log": np.exp,
+    "inverse": lambda eta: 1.0 / eta,
+    "logit": lambda eta: 1.0 / (1.0 + np.exp(-eta)),
+    "sqrt": lambda eta: eta * eta,
+}
+_DEFAULT_LINK = {"gaussian": "identity", "poisson": "log", "gamma": "inverse", "binomial": "logit"}
+
+class TreeEnsemble(NamedTuple):
+    """Árboles aplanados: índices globales de nodo; `feature == -1` en las hojas.
+
+    Predicción = sum(peso_t * árbol_t(x)) / divisor (Random Forest: pesos 1 y divisor
+    = nº de árboles; GBT: `treeWeights` y divisor 1). A la izquierda si x <= umbral.
+    """
+    feature: np.ndarray
+    threshold: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+    value: np.ndarray
+    roots: np.ndarray
+    weights: np.ndarray
+    divisor: float
+    log_target: bool = False
+
+    def leaf_values(self, X: np.ndarray) -> np.ndarray:
+        """Valor de la hoja de cada (fila, árbol): todas las filas y árboles a la vez."""
+        node = np.tile(self.roots, (len(X), 1))
+        rows = np.arange(len(X))[:, None]
+        while True:
+            feat = self.feature[node]
+            inner = feat >= 0
+            if not inner.any():
+                return self.value[node]
+            x = X[rows, np.where(inner, feat, 0)]
+            nxt = np.where(x <= self.threshold[node], self.left[node], self.right[node])
+            node = np.where(inner, nxt, node)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        values = self.leaf_values(X)
+        out = np.zeros(len(X))
+        for t in range(values.shape[1]):  # mismo orden de suma que Spark
+            out += self.weights[t] * values[:, t]
+        out /= self.divisor
+        return np.expm1(out) if self.log_target else out
+
+class LinearModel(NamedTuple):
+    """GLM / regresión lineal: link^-1(X @ coef + intercepto)."""
+    coef: np.ndarray
+    intercept: float
+    link: str = "identity"
+    log_target: bool = False
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        out = _LINKS[self.link](X @ self.coef + self.intercept)
+        return np.expm1(out) if self.log_target else out
+
+Submodel = Union[TreeEnsemble, LinearModel]
+
+class ModelArtifact(NamedTuple):
+    name: str
+    features: List[str]
+    scale: np.ndarray  # 1/std (0 si std == 0), igual que StandardScalerModel
+    category_col: str
+    index_col: str
+    labels: List[str]  # StringIndexer con handleInvalid="keep": desconocidas -> len(labels)
+    models: Dict[str, Submodel]
+    metrics: Dict[str, float] = {}
+
+    def design_matrix(self, df: pd.DataFrame) -> np.ndarray:
+        """Features sin escalar en el orden del `VectorAssembler`; nulos -> 0 como en el paso 6."""
+        missing = [f for f in self.features if f != self.index_col and f not in df.columns]
+        if missing:
+            raise ValueError(f"Faltan columnas de features: {', '.join(missing[:5])}")
+        X = np.empty((len(df), len(self.features)))
+        for j, f in enumerate(self.features):
+            if f == self.index_col:
+                codes = pd.Categorical(df[self.category_col], categories=self.labels).codes
+                X[:, j] = np.where(codes < 0, len(self.labels), codes)
+            else:
+                X[:, j] = df[f].to_numpy(dtype=np.float64, na_value=np.nan)
+        return np.nan_to_num(X, nan=0.0)
+
+    def _routes(self, X: np.ndarray) -> Dict[str, np.ndarray]:
+        if "lima" not in self.models:
+            return {"default": np.arange(len(X))}
+        is_lima = X[:, self.features.index(ROUTE_COL)] == 1
+        return {"lima": np.flatnonzero(is_lima), "default": np.flatnonzero(~is_lima)}
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predicción sobre la matriz de `design_matrix` (sin escalar)."""
+        Xs = X * self.scale
+        out = np.empty(len(X))
+        for key, rows in self._routes(X).items():
+            if len(rows):
+                out[rows] = self.models[key].predict(Xs[rows])
+        return out
+
+    def predict_interval(self, X: np.ndarray, coverage: float = 0.8) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(predicción, inferior, superior).
+
+        En un Random Forest el intervalo son los percentiles de las predicciones de
+        cada árbol; en GBT/GLM, +- el RMSE de validación guardado en `metrics`.
+        """
+        pred = self.predict(X)
+        rmse = self.metrics.get("RMSE", 0.0)
+        lower, upper = pred - rmse, pred + rmse
+        Xs = X * self.scale
+        for key, rows in self._routes(X).items():
+            model = self.models[key]
+            if len(rows) and isinstance(model, TreeEnsemble) and model.divisor > 1:
+                per_tree = model.leaf_values(Xs[rows])
+                if model.log_target:
+                    per_tree = np.expm1(per_tree)
+                q = np.percentile(per_tree, [50 - coverage * 50, 50 + coverage * 50], axis=1)
+                lower[rows], upper[rows] = q[0], q[1]
+        return pred, np.maximum(lower, 0.0), upper
+
+    def predict_frame(self, df: pd.DataFrame) -> np.ndarray:
+        return self.predict(self.design_matrix(df))
+
+    def save(self, path: str):
+        arrays = {"features": np.array(self.features, dtype=str), "scale": self.scale,
+                  "labels": np.array(self.labels, dtype=str)}
+        models = {}
+        for key, model in self.models.items():
+            if isinstance(model, TreeEnsemble):
+                models[key] = {"kind": "trees", "divisor": model.divisor, "log_target": model.log_target}
+                for field in ("feature", "left", "right", "roots"):
+                    arrays[f"{key}__{field}"] = getattr(model, field).astype(np.int32)
+                for field in ("threshold", "value", "weights"):
+                    arrays[f"{key}__{field}"] = getattr(model, field)
+            else:
+                models[key] = {"kind": "linear", "intercept": model.intercept, "link": model.link,
+                               "log_target": model.log_target}
+                arrays[f"{key}__coef"] = model.coef
+        meta = {"name": self.name, "category_col": self.category_col, "index_col": self.index_col,
+                "metrics": self.metrics, "models": models}
+        np.savez_compressed(path, meta=np.array(json.dumps(meta)), **arrays)
+
+def load_artifact(path: str) -> ModelArtifact:
+    with np.load(path) as z:
+        meta = json.loads(str(z["meta"]))
+        models = {}
+        for key, m in meta["models"].items():
+            if m["kind"] == "trees":
+                models[key] = TreeEnsemble(
+                    *(z[f"{key}__{f}"].astype(np.int64) if f in ("feature", "left", "right", "roots")
+                      else z[f"{key}__{f}"] for f in TreeEnsemble._fields[:7]),
+                    divisor=m["divisor"], log_target=m["log_target"])
+            else:
+                models[key] = LinearModel(z[f"{key}__coef"], m["intercept"], m["link"], m["log_target"])
+        return ModelArtifact(meta["name"], z["features"].tolist(), z["scale"], meta["category_col"],
+                             meta["index_col"], z["labels"].tolist(), models, meta["metrics"])
+
+def _spark_trees(model) -> Tuple[np.ndarray, ...]:
+    """Nodos de un modelo de árboles de Spark ML leídos de su formato guardado (Parquet).
+
+    Mucho más rápido que recorrer los nodos por py4j: se guarda el modelo en un
+    directorio temporal y se leen los nodos (preorden, ids locales por árbol).
+    """
+    import pyarrow.parquet as pq
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model.write().overwrite().save(f"{tmp}/modelo")
+        table = pq.read_table(f"{tmp}/modelo/data")
+    if "nodeData" in table.column_names:  # ensembles: (treeID, nodeData)
+        tree = table["treeID"].to_numpy()
+        table = table.flatten()
+        table = table.rename_columns([c.replace("nodeData.", "") for c in table.column_names])
+    else:  # un solo árbol
+        tree = np.zeros(table.num_rows, dtype=np.int64)
+    nodes = table.flatten()
+    ids = nodes["id"].to_numpy()
+    order = np.lexsort((ids, tree))
+    tree, ids = tree[order], ids[order]
+    starts = np.flatnonzero(np.r_[True, tree[1:] != tree[:-1]])
+    offset = np.repeat(starts, np.diff(np.r_[starts, len(tree)]))
+    if not np.array_equal(ids, np.arange(len(ids)) - offset):
+        raise ValueError("Formato de árboles de Spark inesperado: ids de nodo no contiguos")
+    if (nodes["split.numCategories"].to_numpy()[order] >= 0).any():
+        raise ValueError("Los splits categóricos no están soportados en el artefacto")
+
+    def child(name):
+        local = nodes[name].to_numpy()[order]
+        return np.where(local >= 0, local + offset, -1)
+
+    left, right = child("leftChild"), child("rightChild")
+    feature = np.where(left >= 0, nodes["split.featureIndex"].to_numpy()[order], -1)
+    cuts = nodes["split.leftCategoriesOrThreshold"].to_pylist()
+    threshold = np.array([cuts[i][0] if cuts[i] else np.nan for i in order])
+    value = nodes["prediction"].to_numpy()[order]
+    return feature, threshold, left, right, value, starts
+
+def spark_submodel(model, log_target: bool = False) -> Submodel:
+    """Convierte un modelo de regresión de Spark ML (RF, GBT, árbol, GLM o lineal)."""
+    kind = type(model).__name__
+    if kind in ("RandomForestRegressionModel", "GBTRegressionModel", "DecisionTreeRegressionModel"):
+        feature, threshold, left, right, value, roots = _spark_trees(model)
+        if kind == "GBTRegressionModel":
+            weights, divisor = np.asarray(model.treeWeights, dtype=np.float64), 1.0
+        else:
+            weights, divisor = np.ones(len(roots)), float(len(roots))
+        return TreeEnsemble(feature, threshold, left, right, value, roots, weights, divisor, log_target)
+    if kind == "GeneralizedLinearRegressionModel":
+        link = model.getLink() if model.isDefined("link") else _DEFAULT_LINK.get(model.getFamily())
+        if link not in _LINKS:
+            raise ValueError(f"Link no soportado en el artefacto: {link}")
+        return LinearModel(model.coefficients.toArray(), float(model.intercept), link, log_target)
+    if kind == "LinearRegressionModel":
+        return LinearModel(model.coefficients.toArray(), float(model.intercept), "identity", log_target)
+    raise ValueError(f"Modelo de Spark no soportado: {kind}")
+
+def from_spark(name: str, feature_model, models: Dict[str, Submodel],
+               metrics: Optional[Dict[str, float]] = None) -> ModelArtifact:
+    """Artefacto a partir del `PipelineModel` de features (StringIndexer, VectorAssembler,
+    StandardScaler) del paso 7 y los sub-modelos ya convertidos con `spark_submodel`."""
+    indexer, assembler, scaler = feature_model.stages
+    std = scaler.std.toArray()
+    with np.errstate(divide="ignore"):
+        scale = np.where(std != 0, 1.0 / std, 0.0)
+    if not scaler.getWithStd():
+        scale = np.ones_like(std)
+    if scaler.getWithMean():
+        raise ValueError("StandardScaler con withMean=True no está soportado en el artefacto")
+    return ModelArtifact(name, list(assembler.getInputCols()), scale, indexer.getInputCol(),
+                         indexer.getOutputCol(), list(indexer.labels), dict(models), dict(metrics or {}))
+
+def projected_features(year):
+    """Features que cambian al proyectar un año sin datos (paso 13 del notebook)."""
+    return {"years_since_2008": np.subtract(year, 2008), "is_covid_period": np.isin(year, COVID_YEARS).astype(int),
+            "growth_y": 0.02}
+
+def request_frame(gold: pd.DataFrame, regions: Sequence[str], years: Sequence[int],
+                  overrides: Optional[Sequence[Optional[Dict[str, float]]]] = None) -> pd.DataFrame:
+    """Filas de features (capa gold) para predecir cada (region, year) de una vez.
+
+    Si el año está en la capa gold se usa su fila; si es posterior al último año de la
+    región se proyecta como en el paso 13 del notebook (última fila conocida con
+    `years_since_2008`, `is_covid_period` y `growth_y` = 2% actualizados).
+    `overrides[i]` reemplaza features puntuales de la fila i (p. ej. `y_lag1`).
+    """
+    regions = pd.Index(regions, dtype=object)
+    years = np.asarray(years, dtype=np.int64)
+    unknown = regions[~regions.isin(gold["region"])]
+    if len(unknown):
+        raise ValueError(f"Región desconocida: {unknown[0]}")
+    keys = pd.MultiIndex.from_frame(gold[["region", "year"]])
+    pos = keys.get_indexer(pd.MultiIndex.from_arrays([regions, years]))
+    last = gold["year"].groupby(gold["region"]).idxmax()
+    projected = pos < 0
+    if projected.any():
+        last_pos = gold.index.get_indexer(last.loc[regions[projected]])
+        early = years[projected] < gold["year"].to_numpy()[last_pos]
+        if early.any():
+            i = np.flatnonzero(early)[0]
+            raise ValueError(f"No hay datos de {regions[projected][i]} para {years[projected][i]}")
+        pos[projected] = last_pos
+    rows = gold.take(pos).reset_index(drop=True)
+    if projected.any():
+        year = years[projected]
+        for name, value in {"year": year, **projected_features(year)}.items():
+            rows.loc[projected, name] = np.broadcast_to(value, year.shape).astype(rows[name].dtype)
+    overrides = [values or {} for values in overrides or []]
+    given = pd.DataFrame(overrides)
+    for name in given.columns:
+        if name not in rows.columns or name in ("year", "region", TOTAL_COL):
+            raise ValueError(f"Feature desconocida: {name}")
+        mask = given[name].notna().to_numpy()
+        rows.loc[mask, name] = given[name].to_numpy(dtype=np.float64)[mask].astype(rows[name].dtype)
+    return rows
+
+def request_features(gold: pd.DataFrame, region: str, year: int,
+                     overrides: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """Una fila de `request_frame`."""
+    return request_frame(gold, [region], [year], [overrides])
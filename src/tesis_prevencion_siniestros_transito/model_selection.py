@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""Selección de modelos de los pasos 7-9 y 14 del notebook, con entrenamientos concurrentes.
+
+La matriz de features (StringIndexer + VectorAssembler + StandardScaler, ajustados con
+los años de entrenamiento) se calcula una sola vez para todo `df_model` y queda en
+caché; el holdout y cada pliegue de la validación temporal solo filtran por año.
+
+Cada ajuste (candidato x partición) es un job de Spark independiente y se lanza
+desde un pool de hilos acotado (`max_workers`), igual que `parallelism` en
+`pyspark.ml.tuning`: los jobs comparten la sesión y el planificador de Spark los
+corre a la vez. Un pool de procesos no sirve aquí porque la SparkSession no se
+puede compartir entre procesos. RMSE y MAE salen de una sola agregación por ajuste,
+y los tamaños de cada partición de un único `groupBy("year")`.
+
+Requiere `pyspark` (ver requirements-notebook.txt) y Java.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .pipeline import TOTAL_COL
+
+SPLIT_YEAR = 2021  # último año de entrenamiento del holdout (paso 7)
+SEED = 42
+MAX_WORKERS = 4
+CV_MODELS = ("Random_Forest",)
+# columnas que se conservan de la matriz en caché
+KEEP_COLUMNS = ("year", "region", "is_lima", TOTAL_COL, "log_total", "features")
+
+class Split(NamedTuple):
+    split: int  # 1.. como en el paso 14; 0 es el holdout
+    train_years: List[int]
+    test_years: List[int]
+
+class Candidate(NamedTuple):
+    name: str
+    # semilla -> {"default"/"lima": (estimador sin ajustar, objetivo en log1p)};
+    # con "lima", ese sub-modelo se entrena y aplica a is_lima == 1 y "default" al resto
+    build: Callable[[int], Dict[str, Tuple[object, bool]]]
+
+class Selection(NamedTuple):
+    results: Dict[str, Dict[str, float]]  # modelo -> {"RMSE", "MAE"} del holdout
+    models: Dict[str, Dict[str, Tuple[object, bool]]]  # modelo -> {clave: (modelo ajustado, log_target)}
+    predictions: Dict[str, object]  # modelo -> DataFrame (year, region, TOTAL_COL, prediction)
+    cross_validation: List[dict]
+    best_model: str
+    train_size: int
+    test_size: int
+
+def time_series_splits(years: Sequence[int], n_splits: int = 3, test_size: int = 2,
+                       min_train: int = 5) -> List[Split]:
+    """Particiones del paso 14: ventanas de `test_size` años al final, entrenando con todo
+    lo anterior; se omiten las que dejan `min_train` años o menos para entrenar."""
+    years = sorted(set(int(y) for y in years))
+    splits = []
+    for split in range(n_splits):
+        point = len(years) - (n_splits - split) * test_size
+        if point <= min_train:
+            continue
+        splits.append(Split(split + 1, years[:point], years[point:point + test_size]))
+    return splits
+
+def feature_pipeline(feature_cols: Sequence[str]):
+    """Pipeline de features del paso 7."""
+    from pyspark.ml import Pipeline
+    from pyspark.ml.feature import StandardScaler, StringIndexer, VectorAssembler
+
+    return Pipeline(stages=[
+        StringIndexer(inputCol="region_size_category", outputCol="region_size_idx", handleInvalid="keep"),
+        VectorAssembler(inputCols=list(feature_cols) + ["region_size_idx"], outputCol="features_raw",
+                        handleInvalid="keep"),
+        StandardScaler(inputCol="features_raw", outputCol="features", withStd=True, withMean=False),
+    ])
+
+def prepare_features(df_model, feature_cols: Sequence[str], split_year: int = SPLIT_YEAR):
+    """Ajusta el pipeline con los años <= `split_year` y devuelve `(feature_model, prepared)`,
+    con `prepared` = todo `df_model` transformado, reducido a KEEP_COLUMNS y en caché."""
+    from pyspark.sql import functions as F
+
+    feature_model = feature_pipeline(feature_cols).fit(df_model.filter(F.col("year") <= split_year))
+    prepared = feature_model.transform(df_model)
+    prepared = prepared.select(*[c for c in KEEP_COLUMNS if c in prepared.columns]).cache()
+    return feature_model, prepared
+
+def default_candidates() -> List[Candidate]:
+    """Modelos de los pasos 8 y 9 con sus hiperparámetros."""
+    from pyspark.ml.regression import GBTRegressor, GeneralizedLinearRegression, RandomForestRegressor
+
+    return [
+        Candidate("Poisson_GLM", lambda seed: {"default": (GeneralizedLinearRegression(
+            family="poisson", link="log", maxIter=100, regParam=0.01, labelCol=TOTAL_COL,
+            featuresCol="features"), False)}),
+        Candidate("Random_Forest", lambda seed: {"default": (RandomForestRegressor(
+            labelCol=TOTAL_COL, featuresCol="features", numTrees=100, maxDepth=10, minInstancesPerNode=5,
+            seed=seed), False)}),
+        Candidate("GBT_LogTarget", lambda seed: {"default": (GBTRegressor(
+            labelCol="log_total", featuresCol="features", maxDepth=5, maxIter=50, stepSize=0.1,
+            seed=seed), True)}),
+        Candidate("Separate_Lima_Model", lambda seed: {
+            "lima": (RandomForestRegressor(labelCol="log_total", featuresCol="features", numTrees=50,
+                                           maxDepth=8, seed=seed), True),
+            "default": (RandomForestRegressor(labelCol=TOTAL_COL, featuresCol="features", numTrees=100,
+                                              maxDepth=10, seed=seed), False)}),
+    ]
+
+def _fit_evaluate(candidate: Candidate, prepared, split: Split, seed: int):
+    """Ajusta los sub-modelos del candidato en `split` y evalúa en sus años de prueba."""
+    from functools import reduce
+
+    from pyspark.sql import functions as F
+
+    train = prepared.filter(F.col("year").isin(split.train_years))
+    test = prepared.filter(F.col("year").isin(split.test_years))
+    estimators = candidate.build(seed)
+    if "lima" in estimators:
+        parts = {"lima": F.col("is_lima") == 1, "default": F.col("is_lima") == 0}
+    else:
+        parts = {key: F.lit(True) for key in estimators}
+    models, outputs = {}, []
+    for key, (estimator, log_target) in estimators.items():
+        model = estimator.fit(train.filter(parts[key]))
+        models[key] = (model, log_target)
+        pred = model.transform(test.filter(parts[key]))
+        prediction = F.expm1("prediction") if log_target else F.col("prediction")
+        outputs.append(pred.select("year", "region", TOTAL_COL, prediction.alias("prediction")))
+    predictions = reduce(lambda a, b: a.union(b), outputs)
+    error = F.col("prediction") - F.col(TOTAL_COL)
+    rmse, mae = predictions.agg(F.sqrt(F.avg(error * error)), F.avg(F.abs(error))).first()
+    return models, predictions, {"RMSE": rmse, "MAE": mae}
+
+def _thread_target(fn):
+    """Propaga las propiedades locales de Spark (grupo de job, etc.) al hilo del pool."""
+    try:
+        from pyspark.util import inheritable_thread_target
+    except ImportError:  # pyspark < 3.2
+        return fn
+    return inheritable_thread_target(fn)
+
+def run_model_selection(prepared, candidates: Optional[Sequence[Candidate]] = None,
+                        split_year: int = SPLIT_YEAR, cv_models: Sequence[str] = CV_MODELS,
+                        n_splits: int = 3, test_size: int = 2, max_workers: int = MAX_WORKERS,
+                        seed: int = SEED) -> Selection:
+    """Holdout (pasos 8-9) y validación temporal (paso 14) en paralelo sobre `prepared`.
+
+    Los candidatos de `cv_models` se validan además en cada partición de
+    `time_series_splits`, con semilla `seed + split - 1` como en el notebook. Un
+    candidato con sub-modelo "lima" se omite en una partición sin filas de Lima en
+    entrenamiento o prueba. El mejor modelo es el de menor RMSE del holdout.
+    """
+    from pyspark.sql import functions as F
+
+    candidates = list(candidates) if candidates is not None else default_candidates()
+    has_lima = "is_lima" in prepared.columns
+    lima = F.sum(F.col("is_lima").cast("long")) if has_lima else F.lit(0)
+    per_year = {r["year"]: (r["n"], r["lima"] or 0)
+                for r in prepared.groupBy("year").agg(F.count("*").alias("n"), lima.alias("lima")).collect()}
+    years = sorted(per_year)
+    holdout = Split(0, [y for y in years if y <= split_year], [y for y in years if y > split_year])
+    if not holdout.train_years or not holdout.test_years:
+        raise ValueError(f"El holdout necesita años hasta {split_year} y posteriores: {years}")
+
+    def usable(candidate, split):
+        if "lima" not in candidate.build(seed):
+            return True
+        return all(sum(per_year[y][1] for y in ys) > 0 for ys in (split.train_years, split.test_years))
+
+    tasks = [(c, holdout, seed) for c in candidates if usable(c, holdout)]
+    tasks += [(c, split, seed + split.split - 1) for split in time_series_splits(years, n_splits, test_size)
+              for c in candidates if c.name in cv_models and usable(c, split)]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as pool:
+        futures = [pool.submit(_thread_target(_fit_evaluate), c, prepared, split, s) for c, split, s in tasks]
+        done = [f.result() for f in futures]
+
+    results, models, predictions, cv = {}, {}, {}, []
+    for (candidate, split, _), (fitted, pred, metrics) in zip(tasks, done):
+        if split.split == 0:
+            results[candidate.name], models[candidate.name] = metrics, fitted
+            predictions[candidate.name] = pred
+        else:
+            cv.append({"model": candidate.name, "split": split.split,
+                       "train_years": f"{min(split.train_years)}-{max(split.train_years)}",
+                       "test_years": f"{min(split.test_years)}-{max(split.test_years)}",
+                       "rmse": metrics["RMSE"], "mae": metrics["MAE"]})
+    best = min(results, key=lambda name: results[name]["RMSE"])
+    return Selection(results, models, predictions, cv, best,
+                     sum(per_year[y][0] for y in holdout.train_years),
+                     sum(per_year[y][0] for y in holdout.test_years))
+
+def data_quality(df_features, prepared, selection: Selection) -> Dict[str, int]:
+    """Bloque "data_quality" de validation_report.json (una agregación por DataFrame)."""
+    from pyspark.sql import functions as F
+
+    row = df_features.agg(F.countDistinct("region"), F.countDistinct("year"), F.count("*")).first()
+    return {"total_regions": row[0], "years_covered": row[1], "records_processed": row[2],
+            "records_in_model": selection.train_size + selection.test_size,
+            "train_size": selection.train_size, "test_size": selection.test_size}
+
+def validation_report(selection: Selection, quality: Optional[Dict[str, int]] = None) -> dict:
+    """Mismo contenido que validation_report.json del paso 12, más la validación temporal."""
+    best = selection.results[selection.best_model]
+    report = {"data_quality": dict(quality or {}), "model_performance": selection.results,
+              "best_model": {"name": selection.best_model, "rmse": best["RMSE"], "mae": best["MAE"]}}
+    if selection.cross_validation:
+        report["cross_validation"] = selection.cross_validation
+    return report
+
+def write_report(report: dict, path: str) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return path
@@ -2,9 +2,13 @@
 # -*- coding: utf-8 -*-
 import argparse
 import sys
-from typing import Optional, List, Tuple, Dict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Tuple, Dict, Mapping
+import numpy as np
 import pandas as pd
 
+from .schema import LONG_COLUMNS, apply_output_schema, write_parquet
+
 YEARS_VALID = set(range(1990, 2101))
 
 def _clean_region(s):
@@ -23,14 +27,51 @@ def _to_int_year(y):
 
 def _safe_parquet(df: pd.DataFrame, path: str) -> bool:
     try:
-        df.to_parquet(path, index=False)
+        write_parquet(df, path)
         return True
     except Exception as e:
         print(f"[WARN] No se pudo escribir Parquet ({e}). Continúo solo con CSV.", file=sys.stderr)
         return False
 
+class WorkbookReader:
+    """Abre el libro una sola vez y cachea la grilla cruda (header=None) de cada hoja.
+
+    Todos los parsers y fallbacks reciben la misma grilla, así el .xlsx no se
+    vuelve a abrir ni descomprimir por cada hoja.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._xls = pd.ExcelFile(path)
+        self.sheet_names: List[str] = list(self._xls.sheet_names)
+        self._grids: Dict[str, pd.DataFrame] = {}
+
+    def raw(self, sheet: str) -> pd.DataFrame:
+        grid = self._grids.get(sheet)
+        if grid is None:
+            grid = self._xls.parse(sheet_name=sheet, header=None)
+            self._grids[sheet] = grid
+        return grid
+
+    def close(self):
+        self._xls.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _read_raw(src, sheet) -> pd.DataFrame:
+    # `src` puede ser una ruta, un WorkbookReader ya abierto o un dict hoja -> grilla
+    if isinstance(src, WorkbookReader):
+        return src.raw(sheet)
+    if isinstance(src, Mapping):
+        return src[sheet]
+    return pd.read_excel(src, sheet_name=sheet, header=None)
+
 def parse_region_year_simple(path, sheet, header_row=2, region_col=0, metric_name="value", metric_label="siniestros_total"):
-    raw = pd.read_excel(path, sheet_name=sheet, header=None)
+    raw = _read_raw(path, sheet)
     header = raw.iloc[header_row].copy()
     header.iloc[region_col] = "region"
     df = raw.iloc[header_row + 1 :].copy()
@@ -46,159 +87,204 @@ def parse_region_year_simple(path, sheet, header_row=2, region_col=0, metric_nam
     df_long["dim_value"] = None
     return df_long[["year", "region", "metric", "dim_name", "dim_value", "value"]]
 
-def parse_year_category_by_region(path, sheet, year_row=1, category_row=2, start_row=3, region_col=0, dim_name="categoria", metric_label="conteo"):
-    raw = pd.read_excel(path, sheet_name=sheet, header=None)
-    years = raw.iloc[year_row].copy().ffill(axis=0)
-    cats = raw.iloc[category_row].copy()
-    data = raw.iloc[start_row:].copy()
-    data = data[data.iloc[:, region_col].notna()]
-    region_series = data.iloc[:, region_col].map(_clean_region)
-    value_block = data.iloc[:, region_col + 1 :].copy()
-    tuples = []
-    for j in range(region_col + 1, region_col + 1 + value_block.shape[1]):
-        y = _to_int_year(years.iloc[j])
-        c = cats.iloc[j]
-        c = str(c).strip() if pd.notna(c) else None
-        tuples.append((y, c))
-    columns = pd.MultiIndex.from_tuples(tuples, names=["year", dim_name])
-    value_block.columns = columns
-    stacked = value_block.stack(level=[0, 1]).to_frame(name="value").reset_index()
-    stacked = stacked.rename(columns={"level_0": "orig_idx"})
-    stacked["region"] = stacked["orig_idx"].map(region_series)
-    stacked = stacked.dropna(subset=["value", "year", dim_name, "region"])
-    stacked["year"] = stacked["year"].astype(int)
-    stacked[dim_name] = stacked[dim_name].astype(str).str.strip()
-    out = stacked[["year", "region", dim_name, "value"]].copy()
-    out.insert(2, "metric", metric_label)
-    out["dim_name"] = dim_name
-    out["dim_value"] = out[dim_name]
-    out = out.drop(columns=[dim_name])
-    return out[["year", "region", "metric", "dim_name", "dim_value", "value"]]
+def _unpivot_block(values: np.ndarray, regions: np.ndarray, years: List[Optional[int]],
+                   cats: List[Optional[str]], dim_name: str, metric_label: str) -> pd.DataFrame:
+    """Formato largo directo desde el bloque 2-D de valores (filas x columnas año/categoría).
 
-def parse_two_row_header_no_region(path, sheet, year_row=1, category_row=2, start_row=3, metric_label="conteo", dim_name="categoria", region_default="PERÚ"):
-    raw = pd.read_excel(path, sheet_name=sheet, header=None)
+    Se arma con `repeat`/`tile` sobre los vectores de región, año y categoría y una sola
+    máscara de validez, sin el DataFrame intermedio del `stack`. Se descartan columnas sin
+    año o sin categoría, filas sin región y celdas vacías. El orden es el mismo que daba
+    `stack(level=[0, 1])`: por fila, año ascendente y categoría en orden de aparición.
+    """
+    rank: Dict[str, int] = {}
+    for c in cats:
+        if c is not None and c not in rank:
+            rank[c] = len(rank)
+    cols = [j for j, (y, c) in enumerate(zip(years, cats)) if y is not None and c is not None]
+    seen = set()
+    for j in cols:
+        if (years[j], cats[j]) in seen:
+            raise ValueError(f"Columnas (año, {dim_name}) duplicadas: {(years[j], cats[j])}")
+        seen.add((years[j], cats[j]))
+    cols.sort(key=lambda j: (years[j], rank[cats[j]]))
+    block = values[:, cols]
+    n_rows, n_cols = block.shape
+    mask = (pd.notna(block) & pd.notna(regions)[:, None]).ravel()
+    row_idx = np.repeat(np.arange(n_rows), n_cols)[mask]
+    col_idx = np.tile(np.arange(n_cols), n_rows)[mask]
+    return pd.DataFrame({
+        "year": np.array([years[j] for j in cols], dtype=np.int64)[col_idx],
+        "region": regions[row_idx],
+        "metric": metric_label,
+        "dim_name": dim_name,
+        "dim_value": np.array([cats[j] for j in cols], dtype=object)[col_idx],
+        "value": block.ravel()[mask],
+    })
+
+def _header_vectors(raw: pd.DataFrame, year_row: int, category_row: int, columns) -> Tuple[list, list]:
+    # Año propagado a la derecha (celdas combinadas) y categoría limpia, por columna
     years = raw.iloc[year_row].copy().ffill(axis=0)
     cats = raw.iloc[category_row].copy()
-    data = raw.iloc[start_row:].copy()
-    value_block = data.copy()
-    tuples = []
-    for j in value_block.columns:
+    col_years, col_cats = [], []
+    for j in columns:
         y = _to_int_year(years.iloc[j]) if j < len(years) else None
         c = cats.iloc[j] if j < len(cats) else None
-        c = str(c).strip() if pd.notna(c) else None
-        tuples.append((y, c))
-    value_block.columns = pd.MultiIndex.from_tuples(tuples, names=["year", dim_name])
-    stacked = value_block.stack(level=[0, 1]).to_frame(name="value").reset_index()
-    stacked = stacked.dropna(subset=["value", "year", dim_name])
-    stacked["year"] = stacked["year"].astype(int)
-    stacked[dim_name] = stacked[dim_name].astype(str).str.strip()
-    out = stacked[["year", dim_name, "value"]].copy()
-    out.insert(1, "region", region_default)
-    out.insert(2, "metric", metric_label)
-    out["dim_name"] = dim_name
-    out["dim_value"] = out[dim_name]
-    out = out.drop(columns=[dim_name])
-    return out[["year", "region", "metric", "dim_name", "dim_value", "value"]]
-
-def normalize_workbook(path: str):
-    xls = pd.ExcelFile(path)
-    sheets = xls.sheet_names
+        col_years.append(y)
+        col_cats.append(str(c).strip() if pd.notna(c) else None)
+    return col_years, col_cats
+
+def parse_year_category_by_region(path, sheet, year_row=1, category_row=2, start_row=3, region_col=0, dim_name="categoria", metric_label="conteo"):
+    raw = _read_raw(path, sheet)
+    data = raw.iloc[start_row:]
+    data = data[data.iloc[:, region_col].notna()]
+    regions = data.iloc[:, region_col].map(_clean_region).to_numpy(dtype=object)
+    value_cols = range(region_col + 1, raw.shape[1])
+    years, cats = _header_vectors(raw, year_row, category_row, value_cols)
+    values = data.iloc[:, region_col + 1 :].to_numpy()
+    return _unpivot_block(values, regions, years, cats, dim_name, metric_label)
+
+def parse_two_row_header_no_region(path, sheet, year_row=1, category_row=2, start_row=3, metric_label="conteo", dim_name="categoria", region_default="PERÚ"):
+    raw = _read_raw(path, sheet)
+    data = raw.iloc[start_row:]
+    regions = np.full(len(data), region_default, dtype=object)
+    years, cats = _header_vectors(raw, year_row, category_row, range(raw.shape[1]))
+    return _unpivot_block(data.to_numpy(), regions, years, cats, dim_name, metric_label)
+
+# Parámetros comunes de las hojas "año + categoría" por región
+_YC = dict(year_row=1, category_row=2, start_row=3, region_col=0)
+
+# Handlers explícitos: hoja -> (parser, parámetros). Tabla de datos (no lambdas)
+# para poder reutilizarla en el modo streaming.
+SHEET_SPECS: Dict[str, Tuple[str, dict]] = {
+    "SINIESTROS AÑO REGIÓN": ("region_year", dict(
+        header_row=2, region_col=0,
+        metric_name="value", metric_label="siniestros_total")),
+    "SINIESTROS POR TIPO": ("year_category", dict(
+        _YC, dim_name="tipo_accidente", metric_label="siniestros_por_tipo")),
+    "CAUSAS POR REGIÓN": ("year_category", dict(
+        _YC, dim_name="causa", metric_label="siniestros_por_causa")),
+    # Extras (intento con el genérico por región: año + categoría)
+    "CONDUCTORES INVOLUCRADOS": ("year_category", dict(
+        _YC, dim_name="condicion_conductor", metric_label="conductores_involucrados")),
+    "VEHICULOS INVOLUCRADOS": ("year_category", dict(
+        _YC, dim_name="tipo_vehiculo", metric_label="vehiculos_involucrados")),
+    "VEHICULOS POR TIPO Y REGIÓN": ("year_category", dict(
+        _YC, dim_name="tipo_vehiculo", metric_label="vehiculos_por_tipo_region")),
+    "FRANJA HORARIA": ("year_category", dict(
+        _YC, dim_name="franja_horaria", metric_label="siniestros_por_franja_horaria")),
+    "DÍA": ("year_category", dict(
+        _YC, dim_name="dia_semana", metric_label="siniestros_por_dia")),
+    "SINIESTROS RURALES POR TIPO": ("year_category", dict(
+        _YC, dim_name="tipo_accidente_rural", metric_label="siniestros_rurales_por_tipo")),
+    "SINIES. RURAL HERIDO FALLECIDO": ("year_category", dict(
+        _YC, dim_name="condicion_victima", metric_label="siniestros_rurales_victimas")),
+    # FALLECIDOS/HERIDOS suelen tener cabeceras dobles complejas; probamos genérico por región
+    "FALLECIDOS": ("year_category", dict(
+        _YC, dim_name="grupo_edad_o_categoria", metric_label="fallecidos")),
+    "HERIDOS": ("year_category", dict(
+        _YC, dim_name="grupo_edad_o_categoria", metric_label="heridos")),
+}
+
+PARSERS = {
+    "region_year": parse_region_year_simple,
+    "year_category": parse_year_category_by_region,
+    "national": parse_two_row_header_no_region,
+}
+
+def generic_specs(sheet: str) -> List[Tuple[str, dict]]:
+    """Intentos genéricos (en orden) para hojas sin handler explícito."""
+    metric_label = f"{sheet.lower().replace(' ', '_')}"
+    return [
+        ("year_category", dict(_YC, dim_name="categoria", metric_label=metric_label)),
+        ("national", dict(year_row=1, category_row=2, start_row=3,
+                          dim_name="categoria", metric_label=metric_label)),
+    ]
+
+def normalize_sheet(book, sh: str) -> Tuple[Optional[pd.DataFrame], str]:
+    """Normaliza una hoja con su handler (o los genéricos). Devuelve (df o None, log)."""
+    try:
+        if sh in SHEET_SPECS:
+            kind, params = SHEET_SPECS[sh]
+            df = PARSERS[kind](book, sh, **params)
+            return df, f"OK: {len(df)} filas"
+        # Intento genérico
+        (kind1, params1), (kind2, params2) = generic_specs(sh)
+        try:
+            df_try = PARSERS[kind1](book, sh, **params1)
+            return df_try, f"OK (genérico por región): {len(df_try)} filas"
+        except Exception as e1:
+            try:
+                df_try2 = PARSERS[kind2](book, sh, **params2)
+                return df_try2, f"OK (genérico nacional): {len(df_try2)} filas"
+            except Exception as e2:
+                return None, f"SKIP: no se pudo normalizar automáticamente ({e1} / {e2})"
+    except Exception as e:
+        return None, f"ERROR: {e}"
+
+# Libro (y caché) de cada proceso del pool, abiertos una sola vez por worker
+_WORKER_BOOK: Optional[WorkbookReader] = None
+_WORKER_CACHE = None
+
+def _init_worker(path: str, cache=None):
+    global _WORKER_BOOK, _WORKER_CACHE
+    _WORKER_BOOK = WorkbookReader(path)
+    _WORKER_CACHE = cache
+
+def sheet_spec(sheet: str):
+    """Parámetros con que se procesa la hoja (entran en la clave de la caché)."""
+    return SHEET_SPECS[sheet] if sheet in SHEET_SPECS else generic_specs(sheet)
+
+def _numeric_value(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """`value` como float64 (texto como "-" pasa a NaN y se descarta después), así el
+    fragmento se puede guardar en la caché y se recupera idéntico."""
+    if df is None:
+        return None
+    return df.assign(value=pd.to_numeric(df["value"], errors="coerce").astype("float64"))
+
+def _sheet_result(book, sh: str, cache) -> Tuple[Optional[str], Optional[pd.DataFrame], str, bool]:
+    """(clave, df, log, salió de la caché) de una hoja. La grilla cruda se lee una vez y
+    sirve para la clave y para el parser."""
+    key = None
+    if cache is not None:
+        key = cache.key(sh, book.raw(sh), sheet_spec(sh))
+        hit = cache.get(key)
+        if hit is not None:
+            return key, hit[0], f"{hit[1]} (caché)", True
+    df, msg = normalize_sheet(book, sh)
+    return key, _numeric_value(df), msg, False
+
+def _sheet_result_in_worker(sh: str):
+    return _sheet_result(_WORKER_BOOK, sh, _WORKER_CACHE)
+
+def normalize_workbook(path: str, jobs: int = 1, cache=None):
+    if not isinstance(path, WorkbookReader):
+        with WorkbookReader(path) as book:
+            return normalize_workbook(book, jobs=jobs, cache=cache)
+    book = path
+    sheets = book.sheet_names
+    if jobs > 1 and len(sheets) > 1:
+        # Cada hoja es independiente: lectura, clave de caché y parser corren en el worker y
+        # se recogen en orden de hoja, así el resultado es idéntico al camino serial.
+        with ProcessPoolExecutor(max_workers=min(jobs, len(sheets)),
+                                 initializer=_init_worker, initargs=(book.path, cache)) as ex:
+            results = list(ex.map(_sheet_result_in_worker, sheets))
+        if cache is not None:  # los contadores de los workers no vuelven al proceso padre
+            hits = sum(hit for *_, hit in results)
+            cache.hits += hits
+            cache.misses += len(results) - hits
+    else:
+        results = [_sheet_result(book, sh, cache) for sh in sheets]
+    if cache is not None:
+        # Se guardan las hojas nuevas o cambiadas; las demás ya salieron de la caché
+        for key, df, msg, hit in results:
+            if df is not None and not hit:
+                cache.put(key, df, msg)
     logs = {}
     normalized_parts = []
-    # Handlers explícitos + genéricos
-    handlers = {
-        "SINIESTROS AÑO REGIÓN": lambda: parse_region_year_simple(
-            path, "SINIESTROS AÑO REGIÓN",
-            header_row=2, region_col=0,
-            metric_name="value", metric_label="siniestros_total"
-        ),
-        "SINIESTROS POR TIPO": lambda: parse_year_category_by_region(
-            path, "SINIESTROS POR TIPO",
-            year_row=1, category_row=2, start_row=3, region_col=0,
-            dim_name="tipo_accidente", metric_label="siniestros_por_tipo"
-        ),
-        "CAUSAS POR REGIÓN": lambda: parse_year_category_by_region(
-            path, "CAUSAS POR REGIÓN",
-            year_row=1, category_row=2, start_row=3, region_col=0,
-            dim_name="causa", metric_label="siniestros_por_causa"
-        ),
-        # Extras (intento con el genérico por región: año + categoría)
-        "CONDUCTORES INVOLUCRADOS": lambda: parse_year_category_by_region(
-            path, "CONDUCTORES INVOLUCRADOS",
-            year_row=1, category_row=2, start_row=3, region_col=0,
-            dim_name="condicion_conductor", metric_label="conductores_involucrados"
-        ),
-        "VEHICULOS INVOLUCRADOS": lambda: parse_year_category_by_region(
-            path, "VEHICULOS INVOLUCRADOS",
-            year_row=1, category_row=2, start_row=3, region_col=0,
-            dim_name="tipo_vehiculo", metric_label="vehiculos_involucrados"
-        ),
-        "VEHICULOS POR TIPO Y REGIÓN": lambda: parse_year_category_by_region(
-            path, "VEHICULOS POR TIPO Y REGIÓN",
-            year_row=1, category_row=2, start_row=3, region_col=0,
-            dim_name="tipo_vehiculo", metric_label="vehiculos_por_tipo_region"
-        ),
-        "FRANJA HORARIA": lambda: parse_year_category_by_region(
-            path, "FRANJA HORARIA",
-            year_row=1, category_row=2, start_row=3, region_col=0,
-            dim_name="franja_horaria", metric_label="siniestros_por_franja_horaria"
-        ),
-        "DÍA": lambda: parse_year_category_by_region(
-            path, "DÍA",
-            year_row=1, category_row=2, start_row=3, region_col=0,
-            dim_name="dia_semana", metric_label="siniestros_por_dia"
-        ),
-        "SINIESTROS RURALES POR TIPO": lambda: parse_year_category_by_region(
-            path, "SINIESTROS RURALES POR TIPO",
-            year_row=1, category_row=2, start_row=3, region_col=0,
-            dim_name="tipo_accidente_rural", metric_label="siniestros_rurales_por_tipo"
-        ),
-        "SINIES. RURAL HERIDO FALLECIDO": lambda: parse_year_category_by_region(
-            path, "SINIES. RURAL HERIDO FALLECIDO",
-            year_row=1, category_row=2, start_row=3, region_col=0,
-            dim_name="condicion_victima", metric_label="siniestros_rurales_victimas"
-        ),
-        # FALLECIDOS/HERIDOS suelen tener cabeceras dobles complejas; probamos genérico por región
-        "FALLECIDOS": lambda: parse_year_category_by_region(
-            path, "FALLECIDOS",
-            year_row=1, category_row=2, start_row=3, region_col=0,
-            dim_name="grupo_edad_o_categoria", metric_label="fallecidos"
-        ),
-        "HERIDOS": lambda: parse_year_category_by_region(
-            path, "HERIDOS",
-            year_row=1, category_row=2, start_row=3, region_col=0,
-            dim_name="grupo_edad_o_categoria", metric_label="heridos"
-        ),
-    }
-    for sh in sheets:
-        try:
-            if sh in handlers:
-                df = handlers[sh]()
-                normalized_parts.append(df)
-                logs[sh] = f"OK: {len(df)} filas"
-            else:
-                # Intento genérico
-                try:
-                    df_try = parse_year_category_by_region(
-                        path, sh,
-                        year_row=1, category_row=2, start_row=3, region_col=0,
-                        dim_name="categoria", metric_label=f"{sh.lower().replace(' ', '_')}"
-                    )
-                    normalized_parts.append(df_try)
-                    logs[sh] = f"OK (genérico por región): {len(df_try)} filas"
-                except Exception as e1:
-                    try:
-                        df_try2 = parse_two_row_header_no_region(
-                            path, sh,
-                            year_row=1, category_row=2, start_row=3,
-                            dim_name="categoria", metric_label=f"{sh.lower().replace(' ', '_')}"
-                        )
-                        normalized_parts.append(df_try2)
-                        logs[sh] = f"OK (genérico nacional): {len(df_try2)} filas"
-                    except Exception as e2:
-                        logs[sh] = f"SKIP: no se pudo normalizar automáticamente ({e1} / {e2})"
-        except Exception as e:
-            logs[sh] = f"ERROR: {e}"
+    for sh, (_, df, msg, _) in zip(sheets, results):
+        if df is not None:
+            normalized_parts.append(df)
+        logs[sh] = msg
     if not normalized_parts:
         raise RuntimeError("No se pudo normalizar ninguna hoja. Revisa parámetros.")
     final_df = pd.concat(normalized_parts, ignore_index=True)
@@ -213,34 +299,87 @@ def main():
     parser.add_argument("excel_path", help="Ruta al archivo Excel de entrada")
     parser.add_argument("-o", "--output_csv", default="data/processed/siniestros_normalizado.csv", help="Ruta de salida CSV")
     parser.add_argument("--parquet", default="data/processed/siniestros_normalizado.parquet", help="Ruta de salida Parquet (opcional)")
+    parser.add_argument("--dataset", default=None,
+                        help="Carpeta de salida adicional como dataset Parquet particionado (metric=.../year=...).")
+    parser.add_argument("--row-group-rows", type=int, default=None,
+                        help="Filas por row group en el dataset particionado (default: el de pyarrow).")
     parser.add_argument("--verify", action="store_true", help="Leer el Parquet generado y mostrar resumen para comprobar.")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Leer con openpyxl read-only y escribir por lotes (libros muy grandes, memoria acotada).")
+    parser.add_argument("--batch-rows", type=int, default=50_000,
+                        help="Filas por lote en modo --streaming (default: 50000).")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Procesos para normalizar hojas en paralelo (default: 1, serial).")
+    parser.add_argument("--cache-dir", default="data/cache/hojas",
+                        help="Carpeta de la caché de hojas normalizadas (default: data/cache/hojas).")
+    parser.add_argument("--cache-max-mb", type=float, default=512,
+                        help="Tamaño máximo de la caché en MB; se borran primero los fragmentos menos usados.")
+    parser.add_argument("--no-cache", action="store_true", help="No leer ni escribir la caché de hojas.")
     args = parser.parse_args()
-    final_df, logs = normalize_workbook(args.excel_path)
-    # Guardar CSV
-    final_df.to_csv(args.output_csv, index=False, encoding="utf-8")
-    print(f"[OK] CSV escrito: {args.output_csv} ({len(final_df)} filas)")
-    # Guardar Parquet (si es posible)
-    wrote_parquet = False
-    if args.parquet:
-        wrote_parquet = _safe_parquet(final_df, args.parquet)
+    if args.streaming and args.dataset:
+        parser.error("--dataset no está disponible con --streaming")
+    if args.streaming:
+        from .streaming import stream_workbook
+        writer, logs = stream_workbook(args.excel_path, args.output_csv, args.parquet or None,
+                                       batch_rows=args.batch_rows)
+        print(f"[OK] CSV escrito: {args.output_csv} ({writer.rows} filas)")
+        wrote_parquet = writer.wrote_parquet
         if wrote_parquet:
             print(f"[OK] Parquet escrito: {args.parquet}")
+        n_regions, years, metrics = len(writer.regions), writer.years, dict(writer.metrics.most_common())
+        n_rows = writer.rows
+    else:
+        cache = None
+        if not args.no_cache:
+            from .cache import SheetResultCache
+            cache = SheetResultCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+        final_df, logs = normalize_workbook(args.excel_path, jobs=args.jobs, cache=cache)
+        final_df = apply_output_schema(final_df)
+        if cache is not None:
+            print(f"[OK] Caché: {cache.hits} hojas reutilizadas, {cache.misses} normalizadas ({args.cache_dir})")
+        # Guardar CSV
+        final_df.to_csv(args.output_csv, index=False, encoding="utf-8")
+        print(f"[OK] CSV escrito: {args.output_csv} ({len(final_df)} filas)")
+        # Guardar Parquet (si es posible)
+        wrote_parquet = False
+        if args.parquet:
+            wrote_parquet = _safe_parquet(final_df, args.parquet)
+            if wrote_parquet:
+                print(f"[OK] Parquet escrito: {args.parquet}")
+        if args.dataset:
+            from .dataset import write_long_dataset
+            write_long_dataset(final_df, args.dataset, max_rows_per_group=args.row_group_rows)
+            print(f"[OK] Dataset particionado escrito: {args.dataset} (metric=/year=)")
+        n_regions = final_df["region"].nunique()
+        years = (final_df["year"].min(), final_df["year"].max())
+        metrics = final_df["metric"].value_counts().to_dict()
+        n_rows = len(final_df)
     print("\n=== LOGS POR HOJA ===")
     for sh, msg in logs.items():
         print(f"- {sh}: {msg}")
     print("\n=== Resumen rápido ===")
-    print(f"Regiones: {final_df['region'].nunique()}")
-    print(f"Años: {final_df['year'].min()}..{final_df['year'].max()}")
-    print("Métricas:", final_df["metric"].value_counts().to_dict())
+    print(f"Regiones: {n_regions}")
+    print(f"Años: {years[0]}..{years[1]}")
+    print("Métricas:", metrics)
     if args.verify and wrote_parquet:
+        # Solo metadatos del footer y la columna metric: no se decodifica la tabla
+        from .dataset import summarize_long
         print("\n=== VERIFICACIÓN PARQUET ===")
         try:
-            dfp = pd.read_parquet(args.parquet)
-            print("Filas (parquet):", len(dfp))
-            print("Schema:", dfp.dtypes.to_dict())
-            print("Top métricas:", dfp["metric"].value_counts().head(10).to_dict())
-        except Exception as e:
-            print("[WARN] No se pudo leer el Parquet para verificación:", e)
+            summary = summarize_long(args.parquet)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] No se pudo leer el Parquet para verificación: {e}", file=sys.stderr)
+            sys.exit(1)
+        print("Filas (parquet):", summary.rows)
+        print("Schema:", {f.name: str(f.type) for f in summary.schema})
+        print("Top métricas:", dict(list(summary.metrics.items())[:10]))
+        problems = list(summary.problems)
+        if summary.rows != n_rows:
+            problems.append(f"El Parquet tiene {summary.rows} filas y se escribieron {n_rows}")
+        for problem in problems:
+            print(f"[ERROR] {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""Pipeline bronze -> silver -> gold del notebook `prevencion_sinisestros_nb.ipynb` sin Spark.
+
+Son ~450 filas (año, región) en el tablón ancho: con pandas/Arrow el pipeline
+completo tarda menos que el arranque de la JVM. Las etapas reproducen las del
+notebook paso a paso (incluidos sus detalles de semántica: nulos de Spark,
+normalización secuencial de proporciones, desviación muestral) para que la capa
+gold salga igual con cualquiera de los dos motores. Spark sigue disponible con
+`engine="spark"` (ver `spark_backend`).
+
+Capas:
+- bronze: tabla larga tal cual (`year, region, metric, dim_name, dim_value, value`);
+- silver: regiones normalizadas (mayúsculas, sin espacios), sin meses ni totales;
+- gold: tablón ancho `(year, region) x metric__dim_value` (`gold_layer`) y tabla de
+  features con recuperación de totales, proporciones, lags y estadísticos por región
+  (`feature_layer`).
+"""
+import argparse
+import re
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .dataset import read_long
+from .features import build_lag_features
+from .schema import LONG_COLUMNS
+from .slugs import slug
+from .wide import pivot_wide
+
+TOTAL_COL = "siniestros_total__total"
+MESES = ["ENERO", "FEBRERO", "MARZO", "ABRIL", "MAYO", "JUNIO", "JULIO", "AGOSTO",
+         "SEPTIEMBRE", "OCTUBRE", "NOVIEMBRE", "DICIEMBRE"]
+TOTAL_REGION_RE = r"^TOTAL(?:\s+NACIONAL|\s*GENERAL)?$"
+
+BRONZE_PATH = Path("bronze_local") / "siniestros_long_raw.parquet"
+SILVER_PATH = Path("silver_local") / "siniestros_long_clean.parquet"
+GOLD_PATH = Path("gold_local") / "siniestros_features_enhanced.parquet"
+
+FRANJA_PREFIX = "siniestros_por_franja_horaria__"
+DIA_PREFIX = "siniestros_por_dia__"
+_FINE_BAND = re.compile(r"__\d{2}_\d{2}_a_\d{2}_\d{2}$")
+_NIGHT_HOURS = ["20_", "21_", "22_", "23_", "00_", "01_", "02_"]
+LAGS = (1, 2, 3)
+WINDOWS = (3,)
+SIZE_CATEGORIES = [(10000, "very_large"), (5000, "large"), (2000, "medium"), (1000, "small")]
+
+def bronze_layer(source: str) -> pd.DataFrame:
+    """Tabla larga normalizada (archivo Parquet o dataset particionado)."""
+    return read_long(source, columns=LONG_COLUMNS)
+
+def _silver_regions(region: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """(región normalizada, filas que se conservan en silver)."""
+    # trim de Spark: solo espacios; \s de Java: clase ASCII
+    region = region.astype(object).str.strip(" ").str.upper()
+    keep = (region.notna() & ~region.isin(MESES)
+            & ~region.str.contains(TOTAL_REGION_RE, regex=True, flags=re.ASCII, na=False))
+    return region, keep
+
+def silver_layer(bronze: pd.DataFrame) -> pd.DataFrame:
+    """Región en mayúsculas y sin espacios; fuera filas de meses, totales y sin región."""
+    region, keep = _silver_regions(bronze["region"])
+    out = bronze.loc[keep, ["year", "metric", "dim_name", "dim_value", "value"]]
+    out = out.astype({"year": "int32", "value": "float64",
+                      "metric": object, "dim_name": object, "dim_value": object})
+    out["region"] = region[keep]
+    return out.reset_index(drop=True)
+
+def gold_columns(long: pd.DataFrame, slug_fn: Callable[[object], str] = slug) -> List[str]:
+    """Columnas `metric__dim_value` del tablón ancho, ordenadas, para una tabla larga o silver.
+
+    Solo usa `region`, `metric` y `dim_value`; sirve para pasarle a Spark la lista de
+    valores del pivot sin un job extra de distinct (con `slug_fn=table_slug`, los mismos
+    nombres que arma `spark_slug`).
+    """
+    _, keep = _silver_regions(long["region"])
+    pairs = long.loc[keep, ["metric", "dim_value"]].drop_duplicates()
+    return sorted({f"{slug_fn(m)}__{slug_fn(d)}" for m, d in pairs.itertuples(index=False)})
+
+def gold_layer(silver: pd.DataFrame) -> pd.DataFrame:
+    """Tablón ancho `(year, region) x metric__dim_value` con ceros donde no hay dato.
+
+    Mismas columnas que `groupBy("year","region").pivot("colname")` (ordenadas por nombre).
+    """
+    wide = pivot_wide(silver, fillna0=True)
+    cols = sorted(c for c in wide.columns if c not in ("year", "region"))
+    wide = wide[["year", "region"] + cols]
+    return wide.astype({"year": "int32"}).astype({c: "float64" for c in cols})
+
+def _sum_cols(df: pd.DataFrame, cols: List[str]) -> np.ndarray:
+    """Suma fila a fila con nulos como 0, en el mismo orden que `sum_cols` del notebook."""
+    total = df[cols[0]].fillna(0.0).to_numpy(dtype=np.float64)
+    for c in cols[1:]:
+        total = total + df[c].fillna(0.0).to_numpy(dtype=np.float64)
+    return total
+
+def _is_fine_band(name: str) -> bool:
+    return bool(_FINE_BAND.search(name)) and "_01_a_" in name
+
+def recover_and_proportions(wide: pd.DataFrame) -> pd.DataFrame:
+    """Paso 4: corrige totales inconsistentes, agrega proporciones e índices finde/noche."""
+    if TOTAL_COL not in wide.columns:
+        raise ValueError(f"Falta la columna {TOTAL_COL} en el tablón ancho.")
+    df = wide.copy()
+    cnt_franja_all = [c for c in df.columns if c.startswith(FRANJA_PREFIX)]
+    cnt_dia_all = [c for c in df.columns if c.startswith(DIA_PREFIX)]
+    # Solo franjas finas (dos horas) si existen, para no contar dos veces
+    cnt_franja = [c for c in cnt_franja_all if _is_fine_band(c)] or cnt_franja_all
+
+    nan = np.full(len(df), np.nan)
+    sum_dia = _sum_cols(df, cnt_dia_all) if cnt_dia_all else nan
+    sum_franja = _sum_cols(df, cnt_franja) if cnt_franja else nan
+    total = df[TOTAL_COL].to_numpy(dtype=np.float64)
+    check = np.where(sum_dia > 0, sum_dia, np.where(sum_franja > 0, sum_franja, total))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        wrong = (total <= 0) | ((check > 0) & (np.abs(check - total) / total > 0.5))
+    total = np.where(wrong, check, total)
+    df[TOTAL_COL] = total
+
+    props = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for c in cnt_dia_all + cnt_franja:
+            props[f"prop__{c}"] = np.where(total > 0, df[c].to_numpy(dtype=np.float64) / total, 0.0)
+    props = pd.DataFrame(props, index=df.index)
+    prop_dia = [c for c in props.columns if c.startswith("prop__" + DIA_PREFIX)]
+    prop_franja = [c for c in props.columns if c.startswith("prop__" + FRANJA_PREFIX)]
+    # Como en el notebook, cada columna se normaliza con la suma ya actualizada de las
+    # anteriores (Spark resuelve la expresión de la suma en cada withColumn)
+    for group in (prop_dia, prop_franja):
+        for c in group:
+            s = _sum_cols(props, group)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                props[c] = np.where(s > 0.01, props[c].to_numpy() / s, props[c].to_numpy())
+
+    finde = [c for c in prop_dia if c.endswith("__sabado") or c.endswith("__domingo")]
+    night = [c for c in prop_franja if any(h in c for h in _NIGHT_HOURS)][:5]
+    props["idx_finde"] = _sum_cols(props, finde) if finde else 0.0
+    props["idx_noche"] = _sum_cols(props, night) if night else 0.0
+    return pd.concat([df, props], axis=1)
+
+def temporal_features(df: pd.DataFrame, lags: Sequence[int] = LAGS,
+                      windows: Sequence[int] = WINDOWS) -> pd.DataFrame:
+    """Paso 5 (parte temporal): lags, crecimiento y ventanas de años previos por región."""
+    return build_lag_features(df, TOTAL_COL, lags=lags, windows=windows)
+
+def region_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Paso 5 (parte regional): COVID, años desde 2008, estadísticos y tamaño por región."""
+    df = df.copy()
+    df["is_covid_period"] = df["year"].isin([2020, 2021]).astype("int32")
+    df["years_since_2008"] = (df["year"] - 2008).astype("int32")
+    stats = df.groupby("region", sort=False)[TOTAL_COL].agg(["mean", "std", "min", "max"])
+    stats.columns = ["region_avg_total", "region_std_total", "region_min_total", "region_max_total"]
+    stats = stats.fillna(0.0)
+    # join por "region": la clave va primero, como en Spark
+    out = df[["region"] + [c for c in df.columns if c != "region"]].join(stats, on="region")
+    avg = out["region_avg_total"].to_numpy()
+    out["region_size_category"] = np.select([avg > t for t, _ in SIZE_CATEGORIES],
+                                            [name for _, name in SIZE_CATEGORIES], "very_small")
+    out["is_lima"] = (out["region"] == "LIMA").astype("int32")
+    return out
+
+def feature_layer(wide: pd.DataFrame, lags: Sequence[int] = LAGS,
+                  windows: Sequence[int] = WINDOWS) -> pd.DataFrame:
+    """Pasos 4 y 5 del notebook: tabla de features gold, ordenada por (region, year)."""
+    return region_features(temporal_features(recover_and_proportions(wide), lags, windows))
+
+def _resolve_bronze(source: Optional[str], workdir: Path) -> pd.DataFrame:
+    bronze_path, silver_path = workdir / BRONZE_PATH, workdir / SILVER_PATH
+    if source and Path(source).exists():
+        return bronze_layer(source)
+    if bronze_path.exists():
+        print(f"[INFO] Sin fuente; uso la capa bronze existente: {bronze_path}")
+        return bronze_layer(str(bronze_path))
+    if silver_path.exists():
+        print(f"[INFO] Sin fuente ni bronze; uso la capa silver: {silver_path}")
+        return pd.read_parquet(silver_path)
+    raise FileNotFoundError(
+        "No se encontró la tabla larga. Debe existir una de estas rutas:\n"
+        f"  1. Fuente: {source}\n  2. Bronze: {bronze_path}\n  3. Silver: {silver_path}")
+
+def write_layers(workdir: Path, layers: Dict[str, Optional[pd.DataFrame]]):
+    """Escribe las capas presentes en `layers` ("bronze", "silver", "features") bajo `workdir`."""
+    for name, path in (("bronze", BRONZE_PATH), ("silver", SILVER_PATH), ("features", GOLD_PATH)):
+        if layers.get(name) is None:
+            continue
+        (workdir / path).parent.mkdir(parents=True, exist_ok=True)
+        layers[name].to_parquet(workdir / path, index=False)
+
+def run_pipeline(source: Optional[str], workdir: str = ".", engine: str = "pandas", spark=None,
+                 lags: Sequence[int] = LAGS, windows: Sequence[int] = WINDOWS,
+                 incremental: bool = False) -> Dict[str, object]:
+    """Ejecuta bronze -> silver -> gold y escribe las capas bajo `workdir`.
+
+    Devuelve {"bronze", "silver", "wide", "features"} como DataFrames del motor elegido.
+    Con `engine="spark"` se usa `spark` (o se crea una sesión local). Con `incremental`
+    (solo pandas) se recalculan únicamente las claves (year, region) que cambiaron desde
+    la corrida anterior (ver `incremental.update_gold`).
+    """
+    from .incremental import key_hashes, update_gold, write_state
+
+    workdir = Path(workdir)
+    if engine == "spark":
+        if incremental:
+            raise ValueError("El modo incremental solo está disponible con el motor pandas.")
+        from .spark_backend import run_spark_pipeline
+        return run_spark_pipeline(source, workdir, spark=spark, lags=lags, windows=windows)
+    if engine != "pandas":
+        raise ValueError(f"Motor desconocido: {engine!r} (usa 'pandas' o 'spark').")
+    if incremental:
+        return update_gold(source, workdir, lags, windows)
+
+    bronze = _resolve_bronze(source, workdir)
+    silver = silver_layer(bronze)
+    wide = gold_layer(silver)
+    features = feature_layer(wide, lags, windows)
+    write_layers(workdir, {"bronze": bronze, "silver": silver, "features": features})
+    write_state(workdir, key_hashes(silver), list(wide.columns[2:]), lags, windows)
+    return {"bronze": bronze, "silver": silver, "wide": wide, "features": features}
+
+def main():
+    ap = argparse.ArgumentParser(description="Capas bronze/silver/gold para el modelado (pandas o Spark).")
+    ap.add_argument("source", nargs="?", help="Parquet normalizado (tabla larga) o dataset particionado.")
+    ap.add_argument("--workdir", default=".", help="Carpeta donde se crean bronze_local/, silver_local/ y gold_local/.")
+    ap.add_argument("--engine", choices=["pandas", "spark"], default="pandas",
+                    help="Motor de cómputo (por defecto pandas; spark requiere pyspark y Java).")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Recalcular solo las claves (año, región) nuevas o cambiadas desde la última corrida.")
+    args = ap.parse_args()
+    if args.incremental and args.engine == "spark":
+        ap.error("--incremental solo está disponible con --engine pandas")
+
+    try:
+        layers = run_pipeline(args.source, args.workdir, engine=args.engine, incremental=args.incremental)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        sys.exit(1)
+    if args.incremental:
+        cambios = layers["cambios"]
+        detalle = ", ".join(f"{k}={v}" for k, v in cambios.items() if k != "modo")
+        print(f"[OK] gold {cambios['modo']}: {detalle}")
+        print(f"     -> {Path(args.workdir) / GOLD_PATH}")
+        return
+    if args.engine == "spark":
+        counts = {k: v.count() for k, v in layers.items()}
+        n_cols = len(layers["features"].columns)
+    else:
+        counts = {k: len(v) for k, v in layers.items()}
+        n_cols = layers["features"].shape[1]
+    print(f"[OK] bronze={counts['bronze']} silver={counts['silver']} "
+          f"gold={counts['wide']} filas (features: {counts['features']} filas, {n_cols} columnas)")
+    print(f"     -> {Path(args.workdir) / GOLD_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Esquema tipado de la tabla larga normalizada.
+
+La tabla es casi toda texto repetido (región, métrica, dimensión), así que las
+cuatro columnas de texto se guardan como categóricas (diccionario en Parquet),
+`year` como int16 y `value` numérico: Int64 (nullable) si todos los valores son
+enteros, float64 si no.
+"""
+from typing import List
+
+import pandas as pd
+
+LONG_COLUMNS = ["year", "region", "metric", "dim_name", "dim_value", "value"]
+CATEGORICAL_COLUMNS = ["region", "metric", "dim_name", "dim_value"]
+YEAR_DTYPE = "int16"
+VALUE_DTYPES = ("Int64", "float64")
+_EMPTY_TEXT = pd.CategoricalDtype(pd.Index([], dtype="string"))
+
+def apply_output_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Devuelve la tabla larga con el esquema compacto.
+
+    Valores no numéricos (texto como "-" o "S/D") se descartan, igual que los vacíos.
+    """
+    value = pd.to_numeric(df["value"], errors="coerce")
+    keep = value.notna()
+    value = value[keep].astype("float64")
+    if (value == value.round()).all():
+        value = value.astype("Int64")
+    out = {"year": df.loc[keep, "year"].astype(YEAR_DTYPE)}
+    for col in CATEGORICAL_COLUMNS:
+        cat = df.loc[keep, col].astype("category")
+        if cat.cat.categories.empty:  # todo nulo (solo la hoja región x año): dictionary<string>, no <null>
+            cat = cat.astype(_EMPTY_TEXT)
+        out[col] = cat
+    out["value"] = value
+    return pd.DataFrame(out, columns=LONG_COLUMNS).reset_index(drop=True)
+
+def write_parquet(df: pd.DataFrame, path: str):
+    # Diccionario + estadísticas min/max por row group (permiten filtrar sin decodificar)
+    df.to_parquet(path, index=False, engine="pyarrow", use_dictionary=True, write_statistics=True)
+
+def schema_problems(schema) -> List[str]:
+    """Diferencias entre un esquema Arrow (el del footer Parquet) y el de `apply_output_schema`.
+
+    En el dataset particionado `metric` llega como texto simple (viene de la ruta)."""
+    import pyarrow as pa
+
+    def text(t, plain_ok=False):
+        if pa.types.is_dictionary(t):
+            return pa.types.is_string(t.value_type)
+        return plain_ok and pa.types.is_string(t)
+
+    checks = {
+        "year": ("int16", lambda t: t == pa.int16()),
+        "value": ("int64 o double", lambda t: t in (pa.int64(), pa.float64())),
+        "metric": ("dictionary<string>", lambda t: text(t, plain_ok=True)),
+        **{c: ("dictionary<string>", text) for c in CATEGORICAL_COLUMNS if c != "metric"},
+    }
+    problems = [f"Falta la columna {c}" for c in LONG_COLUMNS if c not in schema.names]
+    problems += [f"Columna inesperada: {c}" for c in schema.names if c not in LONG_COLUMNS]
+    for name, (expected, ok) in checks.items():
+        if name in schema.names and not ok(schema.field(name).type):
+            problems.append(f"{name}: se esperaba {expected}, hay {schema.field(name).type}")
+    return problems
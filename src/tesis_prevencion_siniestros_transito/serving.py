@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""Servidor de predicción: página, `/predict`, `/predict/batch`, `/regions` y `/healthz`.
+
+`create_app` carga el artefacto del modelo y el feature store una sola vez. `tpst-serve`
+lo corre sin modo debug y con varios workers:
+
+- gunicorn (Linux/Mac): procesos con la app cargada antes del fork, así que el modelo
+  y la matriz de features se comparten entre workers (copy-on-write);
+- waitress (Windows, o si no hay gunicorn): un proceso con un pool de hilos; NumPy
+  libera el GIL en la parte pesada de la predicción.
+
+La página y las librerías vendorizadas (`web_assets`) se arman y comprimen una sola vez
+al arrancar; `/` y `/vendor/...` solo eligen la codificación y responden 304 si el ETag
+coincide.
+
+Las predicciones son deterministas: cada worker guarda las ya calculadas en un LRU con
+TTL (`ResponseCache`) que se vacía cuando cambia el artefacto o la capa gold.
+
+Requiere Flask (ver requirements-serve.txt).
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Hashable, Optional
+
+import numpy as np
+
+from .feature_store import FeatureStore
+from .model_artifact import load_artifact
+from .pipeline import GOLD_PATH
+from .web_assets import VENDOR_DIR, Asset, download_vendor, load_vendor, prediction_page
+
+MODEL_PATH = Path("models") / "best_model.npz"
+VENDOR_PATH = Path("vendor")  # librerías descargadas con --vendor, bajo la carpeta de trabajo
+CONFIDENCE = 0.8
+MAX_BATCH = 10000
+REGIONS_MAX_AGE = 300  # segundos; después el navegador revalida con ETag
+VENDOR_MAX_AGE = 365 * 24 * 3600  # las rutas de /vendor llevan la versión de la librería
+
+class ResponseCache:
+    """LRU con TTL en memoria (por worker), con contadores de aciertos y fallos."""
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Hashable, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+def _default_paths(workdir: str = "."):
+    workdir = Path(workdir)
+    return (Path(os.environ.get("TPST_MODEL", workdir / MODEL_PATH)),
+            Path(os.environ.get("TPST_GOLD", workdir / GOLD_PATH)))
+
+def _default_vendor(workdir: str = ".") -> Path:
+    """`<workdir>/vendor` si existe; si no, la copia incluida en el paquete (si se instaló con ella)."""
+    local = Path(workdir) / VENDOR_PATH
+    return local if local.is_dir() else VENDOR_DIR
+
+def _overrides(data):
+    """`y_lag1`, `growth_rate` (en %) y `features` ({nombre: valor}) reemplazan features de la capa gold."""
+    overrides = dict(data.get("features") or {})
+    if data.get("y_lag1") is not None:
+        overrides["y_lag1"] = float(data["y_lag1"])
+    if data.get("growth_rate") is not None:
+        overrides["growth_y"] = float(data["growth_rate"]) / 100
+    return overrides
+
+def _cache_key(region: str, year: int, overrides: Optional[dict]) -> tuple:
+    """Solo lo que cambia la predicción: mes, clima, etc. no son features del modelo."""
+    return region, year, tuple(sorted((overrides or {}).items()))
+
+def _send_asset(app, request, asset: Asset, cache_control: str):
+    """Respuesta para `asset` en la mejor codificación aceptada, con ETag por codificación."""
+    encoding = next((e for e in ("br", "gzip") if e in asset.encoded and request.accept_encodings[e]), None)
+    resp = app.response_class(asset.encoded[encoding] if encoding else asset.body, mimetype=asset.mimetype)
+    if encoding:
+        resp.content_encoding = encoding
+    resp.vary.add("Accept-Encoding")
+    resp.set_etag(f"{asset.etag}-{encoding}" if encoding else asset.etag)
+    resp.headers["Cache-Control"] = cache_control
+    return resp.make_conditional(request)
+
+def create_app(model_path: Optional[str] = None, gold_path: Optional[str] = None, workdir: str = ".",
+               cache: Optional[ResponseCache] = None, check_every: float = 5.0,
+               vendor_dir: Optional[str] = None):
+    """App Flask. Sin rutas explícitas usa `TPST_MODEL`/`TPST_GOLD` o las rutas del notebook
+    (`models/best_model.npz` y la capa gold) bajo `workdir`. Cada `check_every` segundos
+    se revisa si hay un artefacto o una capa gold nuevos. Las librerías se buscan en
+    `vendor_dir` o, por defecto, en `<workdir>/vendor`."""
+    from flask import Flask, abort, jsonify, request
+    from flask_cors import CORS
+
+    default_model, default_gold = _default_paths(workdir)
+    model_path = Path(model_path or default_model)
+    gold_path = Path(gold_path or default_gold)
+    if not model_path.exists():
+        raise FileNotFoundError(f"No se encontró el artefacto del modelo: {model_path} "
+                                "(ejecute el paso 11 de prevencion_sinisestros_nb.ipynb)")
+    store = FeatureStore(str(gold_path), load_artifact(str(model_path)), check_every, str(model_path))
+    cache = cache or ResponseCache()
+    vendor_dir = Path(vendor_dir) if vendor_dir else _default_vendor(workdir)
+    page = prediction_page(vendor_dir)
+    vendored: Dict[str, Asset] = {}
+    # versión (capa gold, artefacto) con la que se llenó la caché y /regions ya serializado
+    current = {"version": store.version, "regions": None}
+
+    app = Flask(__name__, static_folder=None)
+    CORS(app)
+
+    def refresh():
+        # Nuevo snapshot gold o nuevo artefacto -> la caché y /regions quedan viejos
+        store.refresh()
+        if store.version != current["version"]:
+            cache.clear()
+            current.update(version=store.version, regions=None)
+
+    def score(regions, years, overrides):
+        # Filas ya calculadas desde la caché; el resto, vectores completos desde el feature
+        # store y una sola llamada al modelo
+        regions, years = [str(r).upper() for r in regions], [int(y) for y in years]
+        refresh()
+        version = current["version"]
+        keys = [(version, *_cache_key(r, y, o)) for r, y, o in zip(regions, years, overrides)]
+        out = np.empty((len(keys), 3), dtype=np.int64)
+        todo = []
+        for i, key in enumerate(keys):
+            hit = cache.get(key)
+            if hit is None:
+                todo.append(i)
+            else:
+                out[i] = hit
+        if todo:
+            pred = store.predict_interval([regions[i] for i in todo], [years[i] for i in todo],
+                                          [overrides[i] for i in todo], CONFIDENCE)
+            out[todo] = np.rint(np.column_stack(pred))
+            for i in todo:
+                cache.put(keys[i], out[i].copy())
+        return regions, years, out[:, 0], out[:, 1], out[:, 2]
+
+    @app.route("/")
+    def home():
+        # Sin plantilla: bytes ya armados; el navegador revalida siempre (304 si no cambió)
+        return _send_asset(app, request, page, "no-cache")
+
+    @app.route("/vendor/<path:name>")
+    def vendor(name):
+        if name not in vendored:
+            asset = load_vendor(name, vendor_dir)
+            if asset is None:
+                abort(404)
+            vendored[name] = asset
+        return _send_asset(app, request, vendored[name], f"public, max-age={VENDOR_MAX_AGE}, immutable")
+
+    @app.route("/predict", methods=["POST"])
+    def predict():
+        # Predicción anual para (region, year). Mes, clima, franja y eventos no son
+        # features del modelo anual y no cambian la predicción.
+        data = request.get_json(silent=True) or {}
+        try:
+            _, _, pred, lower, upper = score([data.get("region", "")], [data.get("year", 0)], [_overrides(data)])
+        except (TypeError, ValueError) as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        return jsonify({
+            "status": "success",
+            "model": store.artifact.name,
+            "result": {"prediction": int(pred[0]), "lower_bound": int(lower[0]),
+                       "upper_bound": int(upper[0]), "confidence": int(CONFIDENCE * 100)},
+        })
+
+    @app.route("/predict/batch", methods=["POST"])
+    def predict_batch():
+        # {"inputs": [{region, year, ...}, ...]} o la grilla {"regions": [...], "years": [...]}
+        # (sin "regions": todas), con y_lag1/growth_rate/features comunes. Respuesta columnar.
+        data = request.get_json(silent=True) or {}
+        try:
+            if "inputs" in data:
+                inputs = list(data["inputs"])
+                regions = [item.get("region", "") for item in inputs]
+                years = [item.get("year", 0) for item in inputs]
+                overrides = [_overrides(item) for item in inputs]
+            else:
+                grid_regions = data.get("regions") or store.regions
+                grid_years = list(data.get("years") or [])
+                regions = [r for r in grid_regions for _ in grid_years]
+                years = [y for _ in grid_regions for y in grid_years]
+                overrides = [_overrides(data)] * len(regions)
+            if len(regions) > MAX_BATCH:
+                raise ValueError(f"Demasiadas filas en el lote: {len(regions)} (máximo {MAX_BATCH})")
+            regions, years, pred, lower, upper = score(regions, years, overrides)
+        except (AttributeError, TypeError, ValueError) as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        return jsonify({
+            "status": "success",
+            "model": store.artifact.name,
+            "confidence": int(CONFIDENCE * 100),
+            "result": {"region": regions, "year": years, "prediction": pred.tolist(),
+                       "lower_bound": lower.tolist(), "upper_bound": upper.tolist()},
+        })
+
+    @app.route("/regions", methods=["GET"])
+    def get_regions():
+        # Regiones de la capa gold, serializadas una vez por snapshot; el navegador las
+        # guarda REGIONS_MAX_AGE segundos y después revalida con If-None-Match (304)
+        refresh()
+        if current["regions"] is None:
+            body = json.dumps(store.regions, ensure_ascii=False).encode()
+            current["regions"] = (body, hashlib.sha1(body).hexdigest())
+        body, etag = current["regions"]
+        resp = app.response_class(body, mimetype="application/json")
+        resp.set_etag(etag)
+        resp.cache_control.public = True
+        resp.cache_control.max_age = REGIONS_MAX_AGE
+        return resp.make_conditional(request)
+
+    @app.route("/healthz", methods=["GET"])
+    def healthz():
+        # Listo cuando el modelo y el feature store están cargados en este worker
+        ready = bool(store.regions)
+        return jsonify({"status": "ok" if ready else "sin datos", "model": store.artifact.name,
+                        "regions": len(store.regions), "pid": os.getpid(), "cache": cache.stats()}), \
+            200 if ready else 503
+
+    return app
+
+def serve(app, host: str = "127.0.0.1", port: int = 5000, workers: int = 2, threads: int = 4):
+    """Corre `app` con gunicorn (procesos que comparten el modelo vía fork) o waitress (hilos)."""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:  # Windows o sin gunicorn
+        BaseApplication = None
+
+    if BaseApplication is None:
+        from waitress import serve as waitress_serve
+
+        waitress_serve(app, host=host, port=port, threads=workers * threads)
+        return
+
+    class _Gunicorn(BaseApplication):
+        def load_config(self):
+            for key, value in {"bind": f"{host}:{port}", "workers": workers, "threads": threads,
+                               "worker_class": "gthread" if threads > 1 else "sync",
+                               "preload_app": True, "accesslog": "-"}.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    _Gunicorn().run()
+
+def main():
+    ap = argparse.ArgumentParser(description="Servidor de predicción de siniestros (producción, sin debug).")
+    ap.add_argument("--workdir", default=".", help="Carpeta con models/ y gold_local/ (la del notebook).")
+    ap.add_argument("--model", help=f"Artefacto del modelo (por defecto $TPST_MODEL o <workdir>/{MODEL_PATH}).")
+    ap.add_argument("--gold", help=f"Capa gold (por defecto $TPST_GOLD o <workdir>/{GOLD_PATH}).")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=5000)
+    ap.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                    help="Procesos (gunicorn); con waitress se usan workers x threads hilos.")
+    ap.add_argument("--threads", type=int, default=4, help="Hilos por worker.")
+    ap.add_argument("--vendor", action="store_true",
+                    help="Descarga Bootstrap, Font Awesome y jQuery a --vendor-dir y termina.")
+    ap.add_argument("--vendor-dir",
+                    help=f"Carpeta de las librerías descargadas (por defecto <workdir>/{VENDOR_PATH}).")
+    args = ap.parse_args()
+
+    if args.vendor:
+        try:
+            print(f"[OK] Librerías en {download_vendor(args.vendor_dir or Path(args.workdir) / VENDOR_PATH)}")
+        except OSError as e:
+            print(f"[ERROR] No se pudieron descargar las librerías: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    try:
+        app = create_app(args.model, args.gold, args.workdir, vendor_dir=args.vendor_dir)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"[OK] http://{args.host}:{args.port} ({args.workers} workers x {args.threads} hilos)")
+    serve(app, args.host, args.port, args.workers, args.threads)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Slug de métricas/dimensiones para nombres de columna del tablón ancho.
+
+`dim_value` tiene unos pocos cientos de valores distintos repetidos en miles de
+filas, así que el slug se calcula solo sobre los distintos (con memo acotado) y
+se devuelve a las filas por código. En Spark el mismo slug es una expresión
+nativa (`spark_slug`), sin UDF Python por fila.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+@lru_cache(maxsize=8192)
+def _slug_str(s: str) -> str:
+    s = s.strip().lower()
+    s = unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
+    s = _NON_ALNUM.sub("_", s).strip("_")
+    return s or "total"
+
+def slug(s) -> str:
+    """'Sábado ' -> 'sabado'; vacío o nulo -> 'total'."""
+    if s is None or (not isinstance(s, str) and pd.isna(s)):
+        return "total"
+    return _slug_str(str(s))
+
+def slug_codes(values) -> Tuple[np.ndarray, pd.Index, List[str]]:
+    """(código por fila, valores distintos, slugs). Nulos -> código -1, que indexa 'total' al final."""
+    codes, uniques = pd.factorize(values)
+    return codes, uniques, [slug(u) for u in uniques] + ["total"]
+
+def slug_series(values: pd.Series) -> pd.Series:
+    """Slug de cada fila calculado solo sobre los valores distintos."""
+    codes, _, slugs = slug_codes(values)
+    return pd.Series(np.asarray(slugs, dtype=object)[codes], index=values.index, name=values.name)
+
+_NON_ASCII = "[^\\x00-\\x7f]"
+_LIGATURES = range(0xFB00, 0xFB07)  # ﬀ ﬁ ﬂ ﬃ ﬄ ﬅ ﬆ (texto copiado de PDF)
+
+@lru_cache(maxsize=1)
+def _ascii_table() -> Tuple[str, str, Dict[str, str]]:
+    """Reemplazos de `slug` para `translate`.
+
+    Devuelve (matching, replace) con los caracteres del plano básico cuya forma ASCII
+    (NFKD) equivale a un solo carácter, y {destino: caracteres} para los de Latin-1 /
+    Latin extendido y las ligaduras que se vuelven varios (ĳ -> ij, ½ -> 12, ﬁ -> fi).
+    Lo que queda fuera de ASCII después de `translate` se elimina (`_NON_ASCII`), igual
+    que `encode("ascii", "ignore")`: guiones largos, comillas tipográficas, etc.
+    """
+    mapped, targets, multi = [], [], {}
+    for code in range(0x80, 0x10000):
+        if 0xD800 <= code < 0xE000:  # surrogates
+            continue
+        ch = chr(code)
+        ascii_ = unicodedata.normalize("NFKD", ch.lower()).encode("ascii", "ignore").decode("ascii")
+        # solo importa lo que sobrevive a `[^a-z0-9]+` -> "_": "…" equivale a "."
+        canon = _NON_ALNUM.sub("_", ascii_)
+        if len(canon) == 1:
+            mapped.append(ch)
+            targets.append(canon)
+        elif canon and (code < 0x370 or code in _LIGATURES):
+            multi[canon] = multi.get(canon, "") + ch
+    return "".join(mapped), "".join(targets), multi
+    return "".join(mapped), "".join(targets), multi
+
+def table_slug(s) -> str:
+    """`spark_slug` en Python (mismos pasos y tabla). Da los nombres de columna exactos que
+    produce Spark, para pasarle los valores del pivot sin descartar filas."""
+    if s is None or (not isinstance(s, str) and pd.isna(s)):
+        return "total"
+    matching, replace, multi = _ascii_table()
+    s = str(s).lower()
+    for target, chars in multi.items():
+        s = re.sub(f"[{chars}]", target, s)
+    s = re.sub(_NON_ASCII, "", s.translate(str.maketrans(matching, replace)))
+    return _NON_ALNUM.sub("_", s).strip("_") or "total"
+
+def spark_slug(col):
+    """Slug como expresión nativa de Spark (lower/translate/regexp_replace), sin UDF ni collect.
+
+    Coincide con `slug` para texto en alfabeto latino y para los símbolos que se vuelven un
+    solo carácter ASCII o desaparecen; siempre coincide con `table_slug`.
+    """
+    from pyspark.sql import functions as F
+
+    matching, replace, multi = _ascii_table()
+    s = F.lower(F.col(col) if isinstance(col, str) else col)
+    for target, chars in multi.items():
+        s = F.regexp_replace(s, f"[{chars}]", target)
+    s = F.regexp_replace(F.translate(s, matching, replace), _NON_ASCII, "")
+    s = F.regexp_replace(F.regexp_replace(s, "[^a-z0-9]+", "_"), "^_+|_+$", "")
+    return F.when(s.isNull() | (s == ""), F.lit("total")).otherwise(s)
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Motor Spark (opcional) del pipeline bronze -> silver -> gold.
+
+Mismas etapas que `pipeline` expresadas en PySpark, tal como las corre el notebook
+`prevencion_sinisestros_nb.ipynb`. Útil cuando el resto del flujo (Spark ML) necesita
+DataFrames de Spark; para solo construir las capas conviene el motor pandas.
+Requiere `pyspark` (ver requirements-notebook.txt) y Java.
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .dataset import read_long
+from .pipeline import (BRONZE_PATH, DIA_PREFIX, FRANJA_PREFIX, GOLD_PATH, LAGS, MESES, SILVER_PATH,
+                       SIZE_CATEGORIES, TOTAL_COL, TOTAL_REGION_RE, WINDOWS, _NIGHT_HOURS, _is_fine_band,
+                       gold_columns)
+from .schema import LONG_COLUMNS
+from .slugs import spark_slug, table_slug
+
+def init_spark(app_name: str = "TPST-Enhanced", memory: str = "8g"):
+    """Sesión local con la configuración del notebook."""
+    from pyspark.sql import SparkSession
+
+    return (SparkSession.builder
+            .appName(app_name)
+            .master("local[*]")
+            .config("spark.sql.shuffle.partitions", "200")
+            .config("spark.driver.memory", memory)
+            .config("spark.sql.adaptive.enabled", "true")
+            .config("spark.sql.adaptive.coalescePartitions.enabled", "true")
+            .getOrCreate())
+
+def sum_cols(cols: List[str]):
+    """Suma de columnas con nulos como 0."""
+    from pyspark.sql import functions as F
+
+    if not cols:
+        return F.lit(None).cast("double")
+    expr = F.coalesce(F.col(cols[0]), F.lit(0.0))
+    for c in cols[1:]:
+        expr = expr + F.coalesce(F.col(c), F.lit(0.0))
+    return expr
+
+def bronze_layer(spark, source: str):
+    return spark.read.parquet(str(source)).select(*LONG_COLUMNS)
+
+def silver_layer(df_bronze):
+    from pyspark.sql import functions as F
+
+    return (df_bronze
+        .withColumn("region_norm", F.upper(F.trim(F.col("region"))))
+        .filter(~F.col("region_norm").isin(MESES))
+        .filter(~F.col("region_norm").rlike(TOTAL_REGION_RE))
+        .withColumn("year", F.col("year").cast("int"))
+        .withColumn("value", F.col("value").cast("double"))
+        .drop("region")
+        .withColumnRenamed("region_norm", "region"))
+
+def pivot_values(path: str) -> List[str]:
+    """Valores del pivot leyendo solo region/metric/dim_value del Parquet (archivo o carpeta).
+
+    Se calculan con `table_slug`, el equivalente exacto de `spark_slug`: `pivot` descarta
+    las filas cuyo `colname` no está en la lista."""
+    return gold_columns(read_long(str(path), columns=["region", "metric", "dim_value"]), table_slug)
+
+def gold_layer(df_silver, columns: Optional[List[str]] = None):
+    """Tablón ancho. Con `columns` (ver `pivot_values`) Spark no lanza un job para descubrirlas."""
+    from pyspark.sql import functions as F
+
+    df_aug = df_silver.withColumn(
+        "colname", F.concat_ws("__", spark_slug("metric"), spark_slug("dim_value")))
+    return (df_aug
+        .groupBy("year", "region")
+        .pivot("colname", columns)
+        .agg(F.sum("value"))
+        .fillna(0.0))
+
+def recover_and_proportions(df_wide):
+    from pyspark.sql import functions as F
+
+    cnt_franja_all = [c for c in df_wide.columns if c.startswith(FRANJA_PREFIX)]
+    cnt_dia_all = [c for c in df_wide.columns if c.startswith(DIA_PREFIX)]
+    cnt_franja = [c for c in cnt_franja_all if _is_fine_band(c)] or cnt_franja_all
+
+    df_wide = (df_wide
+        .withColumn("sum_cnt_dia", sum_cols(cnt_dia_all) if cnt_dia_all else F.lit(None))
+        .withColumn("sum_cnt_franja", sum_cols(cnt_franja) if cnt_franja else F.lit(None)))
+    df_wide = df_wide.withColumn(
+        "total_check",
+        F.when(F.col("sum_cnt_dia").isNotNull() & (F.col("sum_cnt_dia") > 0), F.col("sum_cnt_dia"))
+        .when(F.col("sum_cnt_franja").isNotNull() & (F.col("sum_cnt_franja") > 0), F.col("sum_cnt_franja"))
+        .otherwise(F.col(TOTAL_COL)))
+    df_wide = df_wide.withColumn(
+        TOTAL_COL,
+        F.when((F.col(TOTAL_COL) <= 0)
+               | ((F.col("total_check") > 0)
+                  & (F.abs(F.col("total_check") - F.col(TOTAL_COL)) / F.col(TOTAL_COL) > 0.5)),
+               F.col("total_check"))
+        .otherwise(F.col(TOTAL_COL))
+    ).drop("total_check", "sum_cnt_dia", "sum_cnt_franja")
+
+    for c in cnt_dia_all + cnt_franja:
+        df_wide = df_wide.withColumn(
+            f"prop__{c}", F.when(F.col(TOTAL_COL) > 0, F.col(c) / F.col(TOTAL_COL)).otherwise(0.0))
+
+    prop_franja = [c for c in df_wide.columns if c.startswith("prop__" + FRANJA_PREFIX)]
+    prop_dia = [c for c in df_wide.columns if c.startswith("prop__" + DIA_PREFIX)]
+    for group in (prop_dia, prop_franja):
+        if group:
+            total = sum_cols(group)
+            for c in group:
+                df_wide = df_wide.withColumn(c, F.when(total > 0.01, F.col(c) / total).otherwise(F.col(c)))
+
+    finde = [c for c in prop_dia if c.endswith("__sabado") or c.endswith("__domingo")]
+    night = [c for c in prop_franja if any(h in c for h in _NIGHT_HOURS)][:5]
+    return (df_wide
+        .withColumn("idx_finde", sum_cols(finde) if finde else F.lit(0.0))
+        .withColumn("idx_noche", sum_cols(night) if night else F.lit(0.0)))
+
+def temporal_features(df, lags: Sequence[int] = LAGS, windows: Sequence[int] = WINDOWS):
+    from pyspark.sql import Window, functions as F
+
+    win = Window.partitionBy("region").orderBy("year")
+    for k in lags:
+        df = df.withColumn(f"y_lag{k}", F.lag(F.col(TOTAL_COL), k).over(win))
+    lag1 = F.lag(F.col(TOTAL_COL), 1).over(win)
+    df = df.withColumn("growth_y", F.when(lag1 > 0, (F.col(TOTAL_COL) - lag1) / lag1).otherwise(0.0))
+    for w in windows:
+        df = (df
+            .withColumn(f"rolling_avg_{w}y", F.avg(TOTAL_COL).over(win.rowsBetween(-w, -1)))
+            .withColumn(f"rolling_std_{w}y", F.stddev(TOTAL_COL).over(win.rowsBetween(-w, -1))))
+    return df
+
+def region_features(df):
+    from pyspark.sql import functions as F
+
+    df = (df
+        .withColumn("is_covid_period", F.when(F.col("year").isin([2020, 2021]), 1).otherwise(0))
+        .withColumn("years_since_2008", F.col("year") - 2008))
+    region_stats = df.groupBy("region").agg(
+        F.avg(TOTAL_COL).alias("region_avg_total"),
+        F.stddev(TOTAL_COL).alias("region_std_total"),
+        F.min(TOTAL_COL).alias("region_min_total"),
+        F.max(TOTAL_COL).alias("region_max_total"),
+    ).fillna(0.0)
+    df = df.join(region_stats, "region", "left")
+
+    size = F.when(F.col("region_avg_total") > SIZE_CATEGORIES[0][0], SIZE_CATEGORIES[0][1])
+    for threshold, name in SIZE_CATEGORIES[1:]:
+        size = size.when(F.col("region_avg_total") > threshold, name)
+    return (df
+        .withColumn("region_size_category", size.otherwise("very_small"))
+        .withColumn("is_lima", F.when(F.col("region") == "LIMA", 1).otherwise(0)))
+
+def feature_layer(df_wide, lags: Sequence[int] = LAGS, windows: Sequence[int] = WINDOWS):
+    return region_features(temporal_features(recover_and_proportions(df_wide), lags, windows))
+
+def run_spark_pipeline(source: Optional[str], workdir: Path, spark=None, lags: Sequence[int] = LAGS,
+                       windows: Sequence[int] = WINDOWS) -> Dict[str, object]:
+    """Versión Spark de `pipeline.run_pipeline` (mismas rutas de salida, en directorios Spark)."""
+    spark = spark or init_spark()
+    bronze_path, silver_path = workdir / BRONZE_PATH, workdir / SILVER_PATH
+    if source and Path(source).exists():
+        df_bronze, long_path = bronze_layer(spark, source), source
+        df_bronze.repartition(4).write.mode("overwrite").parquet(str(bronze_path))
+    elif bronze_path.exists():
+        df_bronze, long_path = spark.read.parquet(str(bronze_path)), bronze_path
+    elif silver_path.exists():
+        df_bronze, long_path = spark.read.parquet(str(silver_path)), silver_path
+    else:
+        raise FileNotFoundError(
+            "No se encontró la tabla larga. Debe existir una de estas rutas:\n"
+            f"  1. Fuente: {source}\n  2. Bronze: {bronze_path}\n  3. Silver: {silver_path}")
+
+    df_silver = silver_layer(df_bronze)
+    df_silver.repartition(4).write.mode("overwrite").parquet(str(silver_path))
+    df_wide = gold_layer(df_silver, pivot_values(long_path))
+    df_features = feature_layer(df_wide, lags, windows)
+    df_features.write.mode("overwrite").parquet(str(workdir / GOLD_PATH))
+    return {"bronze": df_bronze, "silver": df_silver, "wide": df_wide, "features": df_features}
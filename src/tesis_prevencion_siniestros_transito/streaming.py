@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""Modo streaming de `tpst-normalizar` para libros muy grandes (p. ej. distritales).
+
+Lee cada hoja con el iterador read-only/values-only de openpyxl y emite filas en
+formato largo (year, region, metric, dim_name, dim_value, value) hoja por hoja,
+escribiéndolas por lotes en CSV/Parquet. No se materializa la grilla completa ni
+las copias del `stack`, así que la memoria pico queda acotada a un lote de filas
+más el buffer del escritor.
+
+Diferencias con el modo normal:
+- el orden de filas es fila-de-la-hoja primero (el modo normal es columna primero
+  en "SINIESTROS AÑO REGIÓN");
+- `value` se guarda numérico: celdas de texto ("-", "S/D", ...) se descartan;
+- las hojas sin handler explícito solo prueban el genérico por región.
+"""
+import sys
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .normalize import LONG_COLUMNS, SHEET_SPECS, _clean_region, _to_int_year, generic_specs
+
+# Textos que pandas.read_excel interpreta como NaN por defecto
+_NA_STRINGS = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+    "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+])
+
+Row = Tuple
+
+def _cell(v):
+    # Misma conversión que hace pandas sobre las celdas de openpyxl
+    if v is None:
+        return None
+    if isinstance(v, float):
+        if v != v:
+            return None
+        if v.is_integer():
+            return int(v)
+    elif isinstance(v, str) and v in _NA_STRINGS:
+        return None
+    return v
+
+def _at(row: Row, j: int):
+    return _cell(row[j]) if j < len(row) else None
+
+def _year_category_columns(years: Row, cats: Row, first_col: int) -> List[Tuple[int, int, str]]:
+    """(columna, año, categoría) válidos; el año se propaga a la derecha (celdas combinadas)."""
+    cols = []
+    last_year = None
+    for j in range(len(cats)):
+        y = _at(years, j)
+        if y is not None:
+            last_year = y
+        if j < first_col:
+            continue
+        year = _to_int_year(last_year)
+        c = _at(cats, j)
+        if year is None or c is None:
+            continue
+        cols.append((j, year, str(c).strip()))
+    return cols
+
+def stream_region_year_simple(rows: Iterable[Row], header_row=2, region_col=0, metric_label="siniestros_total", **_):
+    year_cols = None
+    for i, row in enumerate(rows):
+        if i < header_row:
+            continue
+        if i == header_row:
+            year_cols = []
+            for j in range(len(row)):
+                y = _to_int_year(_at(row, j)) if j != region_col else None
+                if y is not None:
+                    year_cols.append((j, y))
+            continue
+        region = _at(row, region_col)
+        if region is None:
+            continue
+        region = _clean_region(region)
+        for j, y in year_cols:
+            v = _at(row, j)
+            if v is not None:
+                yield (y, region, metric_label, None, None, v)
+
+def stream_year_category_by_region(rows: Iterable[Row], year_row=1, category_row=2, start_row=3, region_col=0,
+                                   dim_name="categoria", metric_label="conteo", **_):
+    years, cats, cols = (), (), None
+    for i, row in enumerate(rows):
+        if i == year_row:
+            years = row
+        if i == category_row:
+            cats = row
+        if i < start_row:
+            continue
+        if cols is None:
+            cols = _year_category_columns(years, cats, region_col + 1)
+        region = _at(row, region_col)
+        if region is None:
+            continue
+        region = _clean_region(region)
+        for j, y, c in cols:
+            v = _at(row, j)
+            if v is not None:
+                yield (y, region, metric_label, dim_name, c, v)
+
+def stream_two_row_header_no_region(rows: Iterable[Row], year_row=1, category_row=2, start_row=3,
+                                    metric_label="conteo", dim_name="categoria", region_default="PERÚ", **_):
+    years, cats, cols = (), (), None
+    for i, row in enumerate(rows):
+        if i == year_row:
+            years = row
+        if i == category_row:
+            cats = row
+        if i < start_row:
+            continue
+        if cols is None:
+            cols = _year_category_columns(years, cats, 0)
+        for j, y, c in cols:
+            v = _at(row, j)
+            if v is not None:
+                yield (y, region_default, metric_label, dim_name, c, v)
+
+STREAMERS = {
+    "region_year": stream_region_year_simple,
+    "year_category": stream_year_category_by_region,
+    "national": stream_two_row_header_no_region,
+}
+
+def _batches(it: Iterator[Row], size: int) -> Iterator[List[Row]]:
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+class LongWriter:
+    """Escribe lotes de filas largas a CSV (y Parquet opcional) y acumula el resumen."""
+
+    def __init__(self, output_csv: str, parquet: Optional[str] = None):
+        self.output_csv = output_csv
+        self.parquet = parquet
+        self.rows = 0
+        self.regions = set()
+        self.years: Tuple[Optional[int], Optional[int]] = (None, None)
+        self.metrics: Counter = Counter()
+        self._csv = open(output_csv, "w", encoding="utf-8", newline="")
+        self._pq = None
+        self._pa_schema = None
+        if parquet:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                # Mismo esquema compacto que el modo normal (value siempre float64 aquí)
+                text = pa.dictionary(pa.int32(), pa.string())
+                self._pa_schema = pa.schema([
+                    ("year", pa.int16()), ("region", text), ("metric", text),
+                    ("dim_name", text), ("dim_value", text), ("value", pa.float64()),
+                ])
+                self._pq = pq.ParquetWriter(parquet, self._pa_schema, use_dictionary=True, write_statistics=True)
+            except Exception as e:
+                print(f"[WARN] No se pudo escribir Parquet ({e}). Continúo solo con CSV.", file=sys.stderr)
+
+    @property
+    def wrote_parquet(self) -> bool:
+        return self._pq is not None
+
+    def write(self, batch: List[Row]):
+        df = pd.DataFrame.from_records(batch, columns=LONG_COLUMNS)
+        df["value"] = pd.to_numeric(df["value"], errors="coerce")
+        df = df.dropna(subset=["value"])
+        if df.empty:
+            return
+        df.to_csv(self._csv, index=False, header=self.rows == 0)
+        if self._pq is not None:
+            import pyarrow as pa
+            self._pq.write_table(pa.Table.from_pandas(df, schema=self._pa_schema, preserve_index=False))
+        self.rows += len(df)
+        self.regions.update(df["region"].unique())
+        lo, hi = int(df["year"].min()), int(df["year"].max())
+        self.years = (lo if self.years[0] is None else min(lo, self.years[0]),
+                      hi if self.years[1] is None else max(hi, self.years[1]))
+        self.metrics.update(df["metric"].value_counts().to_dict())
+
+    def close(self):
+        self._csv.close()
+        if self._pq is not None:
+            self._pq.close()
+
+def stream_workbook(path: str, output_csv: str, parquet: Optional[str] = None,
+                    batch_rows: int = 50_000) -> Tuple[LongWriter, Dict[str, str]]:
+    """Normaliza el libro hoja por hoja sin cargarlo en memoria. Devuelve (writer, logs)."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    writer = LongWriter(output_csv, parquet)
+    logs = {}
+    try:
+        for sh in wb.sheetnames:
+            if sh in SHEET_SPECS:
+                (kind, params), label = SHEET_SPECS[sh], "OK"
+            else:
+                (kind, params), label = generic_specs(sh)[0], "OK (genérico por región)"
+            before = writer.rows
+            try:
+                rows = wb[sh].iter_rows(values_only=True)
+                for batch in _batches(STREAMERS[kind](rows, **params), batch_rows):
+                    writer.write(batch)
+                logs[sh] = f"{label}: {writer.rows - before} filas"
+            except Exception as e:
+                logs[sh] = f"ERROR: {e}"
+    finally:
+        wb.close()
+        writer.close()
+    if writer.rows == 0:
+        raise RuntimeError("No se pudo normalizar ninguna hoja. Revisa parámetros.")
+    return writer, logs
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Página de predicción y librerías de terceros servidas como archivos estáticos.
+
+La página se arma una sola vez al arrancar (no es una plantilla) y cada archivo se
+comprime una sola vez (gzip y, si está instalado el paquete `brotli`, br). Las
+respuestas llevan ETag fuerte y se negocia la codificación con `Accept-Encoding`.
+
+Bootstrap, Font Awesome y jQuery se copian a `<workdir>/vendor/` (o `--vendor-dir`) con
+`tpst-serve --vendor`; `web/vendor/` del paquete (VENDOR_DIR) solo se usa si se distribuyó
+con ellos. Si están, la página apunta a `/vendor/...` y funciona sin internet; si no, sigue
+usando los CDN. Las rutas llevan la versión, así que se pueden cachear un año.
+"""
+import gzip
+import hashlib
+import mimetypes
+import urllib.request
+from importlib import resources
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+try:
+    import brotli
+except ImportError:  # opcional: solo gzip
+    brotli = None
+
+VENDOR_DIR = Path(str(resources.files(__package__).joinpath("web", "vendor")))
+
+_BOOTSTRAP = "https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css"
+_FONTAWESOME = "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0"
+_JQUERY = "https://code.jquery.com/jquery-3.6.0.min.js"
+
+# archivo local (relativo a web/vendor) -> URL de origen. all.min.css carga las fuentes
+# desde ../webfonts/, por eso se mantiene esa estructura.
+VENDOR_FILES = {
+    "bootstrap-5.1.3/css/bootstrap.min.css": _BOOTSTRAP,
+    "fontawesome-6.0.0/css/all.min.css": f"{_FONTAWESOME}/css/all.min.css",
+    **{f"fontawesome-6.0.0/webfonts/{name}.{ext}": f"{_FONTAWESOME}/webfonts/{name}.{ext}"
+       for name in ("fa-solid-900", "fa-regular-400", "fa-brands-400", "fa-v4compatibility")
+       for ext in ("woff2", "ttf")},
+    "jquery-3.6.0/jquery.min.js": _JQUERY,
+}
+
+# Enlaces de la página que se cambian por la copia local
+PAGE_LINKS = {
+    _BOOTSTRAP: "bootstrap-5.1.3/css/bootstrap.min.css",
+    f"{_FONTAWESOME}/css/all.min.css": "fontawesome-6.0.0/css/all.min.css",
+    _JQUERY: "jquery-3.6.0/jquery.min.js",
+}
+
+mimetypes.add_type("font/woff2", ".woff2")
+mimetypes.add_type("font/ttf", ".ttf")
+
+class Asset(NamedTuple):
+    body: bytes
+    mimetype: str
+    etag: str
+    encoded: Dict[str, bytes]  # "br"/"gzip" -> cuerpo comprimido (solo si es más chico)
+
+def compressed(body: bytes) -> Dict[str, bytes]:
+    """Codificaciones de `body` que lo achican: "gzip" y, con el paquete `brotli`, "br"."""
+    encoded = {"gzip": gzip.compress(body, 9, mtime=0)}
+    if brotli is not None:
+        encoded["br"] = brotli.compress(body)
+    return {k: v for k, v in encoded.items() if len(v) < len(body)}
+
+def make_asset(body: bytes, mimetype: str) -> Asset:
+    return Asset(body, mimetype, hashlib.sha1(body).hexdigest(), compressed(body))
+
+def load_vendor(name: str, vendor_dir: Optional[Path] = None) -> Optional[Asset]:
+    """Archivo vendorizado; None si no está en la lista o no se descargó."""
+    path = Path(vendor_dir or VENDOR_DIR) / name
+    if name not in VENDOR_FILES or not path.is_file():
+        return None
+    mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if mimetype.startswith("text/") or mimetype.endswith("javascript"):
+        mimetype += "; charset=utf-8"
+    return make_asset(path.read_bytes(), mimetype)
+
+def prediction_page(vendor_dir: Optional[Path] = None, prefix: str = "/vendor/") -> Asset:
+    """HTML de la página, con las librerías locales en vez de los CDN cuando existen."""
+    vendor_dir = Path(vendor_dir or VENDOR_DIR)
+    html = resources.files(__package__).joinpath("web", "prediction.html").read_text(encoding="utf-8")
+    for url, name in PAGE_LINKS.items():
+        if (vendor_dir / name).is_file():
+            html = html.replace(url, prefix + name)
+    return make_asset(html.encode("utf-8"), "text/html; charset=utf-8")
+
+def download_vendor(vendor_dir: Optional[Path] = None, timeout: float = 30.0) -> Path:
+    """Descarga a `vendor_dir` los archivos de VENDOR_FILES que falten."""
+    vendor_dir = Path(vendor_dir or VENDOR_DIR)
+    for name, url in VENDOR_FILES.items():
+        path = vendor_dir / name
+        if path.is_file():
+            continue
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            body = resp.read()
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_bytes(body)
+        tmp.replace(path)
+    return vendor_dir
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Tablón ancho (year, region) x `metric__dim_value` a partir de la tabla larga.
+
+Denso (`pivot_wide`) o disperso (`pivot_coo`): la mayoría de columnas
+`metric__dim_value` están vacías para la mayoría de filas, así que la versión
+dispersa guarda solo las celdas con dato en formato COO. `CooWide.save_npz`
+escribe el mismo formato que `scipy.sparse.save_npz`, de modo que un consumidor
+de ML lo carga con `scipy.sparse.load_npz` (scipy no es necesario para escribirlo).
+"""
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .slugs import slug_codes
+
+def _keyed(df: pd.DataFrame) -> Tuple[pd.Series, List[str]]:
+    """Suma por (year, region, columna) y nombres de columna en orden (métrica, dimensión).
+
+    La clave `metric__dim_value` se calcula una vez para todas las filas (sobre los valores
+    distintos). Métricas sin dimensión -> columna 'total'.
+    """
+    m_codes, metrics, m_slugs = slug_codes(df["metric"])
+    d_codes, _, d_slugs = slug_codes(df["dim_value"])
+    k = len(d_slugs)
+    # par (métrica, dimensión) -> columna; dos valores con el mismo slug caen en la misma columna
+    pair_codes, pairs = pd.factorize(m_codes * k + d_codes % k)
+    names = [f"{m_slugs[p // k]}__{d_slugs[p % k]}" for p in pairs]
+    col_of_pair, col_names = pd.factorize(pd.Index(names))
+    sort_key = {}
+    for c, p in zip(col_of_pair, pairs):
+        key = (str(metrics[p // k]), d_slugs[p % k])
+        sort_key[c] = min(sort_key.get(c, key), key)
+    order = sorted(sort_key, key=sort_key.get)
+    # renumerar columnas según el orden final
+    position = np.empty(len(col_names), dtype=np.int64)
+    position[order] = np.arange(len(order))
+    keyed = pd.DataFrame({
+        "year": df["year"].to_numpy(),
+        "region": df["region"].astype(str).to_numpy(),
+        "col": position[col_of_pair[pair_codes]],
+        "value": df["value"].array,
+    })
+    sums = keyed.groupby(["year", "region", "col"], sort=True)["value"].sum()
+    return sums, [str(col_names[c]) for c in order]
+
+def pivot_wide(df: pd.DataFrame, fillna0: bool = False) -> pd.DataFrame:
+    """Tablón ancho denso en una sola pasada (un groupby/unstack, sin uniones por métrica)."""
+    sums, columns = _keyed(df)
+    wide = sums.unstack("col").reindex(columns=range(len(columns)))
+    wide.columns = columns
+    if fillna0:
+        wide = wide.fillna(0)
+    return wide.reset_index()
+
+class CooWide(NamedTuple):
+    """Tablón ancho disperso: celda (row[i], col[i]) = data[i]; el resto vale `fill_value`."""
+    index: pd.DataFrame  # year, region por fila
+    columns: List[str]
+    row: np.ndarray
+    col: np.ndarray
+    data: np.ndarray
+    fill_value: float
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.index), len(self.columns)
+
+    def to_sparse_frame(self) -> pd.DataFrame:
+        """DataFrame con columnas `SparseDtype` (se densifica una columna a la vez)."""
+        order = np.argsort(self.col, kind="stable")
+        bounds = np.searchsorted(self.col[order], np.arange(len(self.columns) + 1))
+        out = {"year": self.index["year"].to_numpy(), "region": self.index["region"].to_numpy()}
+        for j, name in enumerate(self.columns):
+            sel = order[bounds[j]:bounds[j + 1]]
+            dense = np.full(len(self.index), self.fill_value, dtype=np.float64)
+            dense[self.row[sel]] = self.data[sel]
+            out[name] = pd.arrays.SparseArray(dense, fill_value=self.fill_value)
+        return pd.DataFrame(out)
+
+    def to_long(self) -> pd.DataFrame:
+        """Formato COO "largo-ancho": una fila por celda con dato (year, region, column, value)."""
+        return pd.DataFrame({
+            "year": self.index["year"].to_numpy()[self.row],
+            "region": pd.Categorical(self.index["region"].to_numpy()[self.row]),
+            "column": pd.Categorical.from_codes(self.col, categories=self.columns),
+            "value": self.data,
+        })
+
+    def save_npz(self, path: str):
+        """Formato de `scipy.sparse.save_npz` (COO) + etiquetas de filas/columnas."""
+        np.savez_compressed(
+            path, format=np.array(b"coo"), shape=np.array(self.shape),
+            row=self.row.astype(np.int32), col=self.col.astype(np.int32), data=self.data,
+            row_year=self.index["year"].to_numpy(), row_region=self.index["region"].to_numpy().astype(str),
+            columns=np.array(self.columns, dtype=str), fill_value=np.array(self.fill_value),
+        )
+
+def load_npz(path: str) -> CooWide:
+    with np.load(path) as z:
+        index = pd.DataFrame({"year": z["row_year"], "region": z["row_region"].astype(object)})
+        return CooWide(index, z["columns"].tolist(), z["row"].astype(np.int64), z["col"].astype(np.int64),
+                       z["data"], float(z["fill_value"]))
+
+def pivot_coo(df: pd.DataFrame, fillna0: bool = False) -> CooWide:
+    """Tablón ancho disperso sin pasar por la versión densa.
+
+    Con `fillna0` las celdas vacías valen 0 y los ceros explícitos tampoco se guardan;
+    si no, las celdas vacías son NaN.
+    """
+    sums, columns = _keyed(df)
+    data = sums.to_numpy(dtype=np.float64, na_value=np.nan)
+    fill_value = 0.0 if fillna0 else np.nan
+    keep = (data != 0) if fillna0 else np.ones(len(data), dtype=bool)
+    # `sums` viene ordenado por (year, region): una fila nueva cada vez que cambia la clave
+    year = sums.index.get_level_values("year").to_numpy()
+    region = sums.index.get_level_values("region").to_numpy()
+    starts = np.ones(len(sums), dtype=bool)
+    starts[1:] = (year[1:] != year[:-1]) | (region[1:] != region[:-1])
+    row_codes = np.cumsum(starts) - 1
+    index = pd.DataFrame({"year": year[starts], "region": region[starts]})
+    col = sums.index.get_level_values("col").to_numpy()
+    return CooWide(index, columns, row_codes[keep], col[keep], data[keep], fill_value)
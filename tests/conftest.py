@@ -0,0 +1,79 @@
+import os
+import shutil
+
+import pytest
+from openpyxl import Workbook
+
+YEARS = (2008, 2009, 2010, 2011)
+REGIONS = ("LIMA", "AREQUIPA ", " cusco", "TOTAL NACIONAL")
+
+def _cat_sheet(wb, name, cats, skip=None):
+    ws = wb.create_sheet(name)
+    ws.append([name])
+    row_y, row_c = ["REGIÓN"], [None]
+    for y in YEARS:
+        for j, c in enumerate(cats):
+            row_y.append(y if j == 0 else None)  # celdas combinadas -> solo la primera trae el año
+            row_c.append(c)
+    ws.append(row_y)
+    ws.append(row_c)
+    for i, r in enumerate(REGIONS):
+        vals = []
+        for k, _ in enumerate(YEARS):
+            for j, _ in enumerate(cats):
+                v = i * 1000 + k * 10 + j
+                vals.append(None if skip and (i + k + j) % skip == 0 else v)
+        ws.append([r] + vals)
+
+def build_workbook(path):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "SINIESTROS AÑO REGIÓN"
+    ws.append(["Siniestros por año"])
+    ws.append([])
+    ws.append(["REGIÓN"] + list(YEARS))
+    for i, r in enumerate(REGIONS):
+        ws.append([r] + [100 * (i + 1) + k for k, _ in enumerate(YEARS)])
+    _cat_sheet(wb, "SINIESTROS POR TIPO", ["CHOQUE", "ATROPELLO ", "DESPISTE"], skip=5)
+    _cat_sheet(wb, "DÍA", ["LUNES", "SÁBADO", "DOMINGO"])
+    _cat_sheet(wb, "FRANJA HORARIA", ["00:01 a 02:00", "20:01 a 22:00"])
+    _cat_sheet(wb, "OTRA HOJA", ["A", "B"], skip=3)
+    wb.save(path)
+    return path
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    """Libro sintético con la misma disposición que el Excel MTC 2008-2023."""
+    return str(build_workbook(tmp_path / "siniestros.xlsx"))
+
+@pytest.fixture
+def long_parquet(workbook_path, tmp_path):
+    """Tabla larga del libro sintético con el esquema de salida (como `tpst-normalizar`)."""
+    from tesis_prevencion_siniestros_transito.normalize import normalize_workbook
+    from tesis_prevencion_siniestros_transito.schema import apply_output_schema, write_parquet
+
+    path = tmp_path / "long.parquet"
+    write_parquet(apply_output_schema(normalize_workbook(workbook_path)[0]), str(path))
+    return str(path)
+
+@pytest.fixture
+def gold_workdir(long_parquet, tmp_path):
+    """Carpeta con las capas bronze/silver/gold del libro sintético (como `tpst-pipeline`)."""
+    from tesis_prevencion_siniestros_transito.pipeline import run_pipeline
+
+    run_pipeline(long_parquet, str(tmp_path))
+    return tmp_path
+
+@pytest.fixture(scope="session")
+def spark():
+    """Sesión Spark local; se salta si no hay pyspark o Java."""
+    pytest.importorskip("pyspark")
+    if not (os.environ.get("JAVA_HOME") or shutil.which("java")):
+        pytest.skip("Spark requiere Java")
+    from pyspark.sql import SparkSession
+
+    session = (SparkSession.builder.master("local[1]")
+               .config("spark.sql.shuffle.partitions", "2").config("spark.ui.enabled", "false")
+               .getOrCreate())
+    yield session
+    session.stop()
@@ -0,0 +1,51 @@
+import pandas as pd
+from tesis_prevencion_siniestros_transito.cache import SheetResultCache
+from tesis_prevencion_siniestros_transito.normalize import normalize_workbook
+
+def test_rerun_served_from_cache(workbook_path, tmp_path):
+    cache = SheetResultCache(str(tmp_path / "cache"))
+    first, first_logs = normalize_workbook(workbook_path, cache=cache)
+    assert cache.hits == 0
+    cache = SheetResultCache(str(tmp_path / "cache"))
+    second, second_logs = normalize_workbook(workbook_path, cache=cache)
+    assert cache.misses == 0 and cache.hits == len(first_logs)
+    assert all(msg.endswith("(caché)") for msg in second_logs.values())
+    pd.testing.assert_frame_equal(first, second)
+
+def test_key_depends_on_content_and_params():
+    grid = pd.DataFrame([["REG", 2008], ["LIMA", 1]])
+    changed = grid.copy()
+    changed.iloc[1, 1] = 2
+    spec = ("year_category", {"dim_name": "causa"})
+    k = SheetResultCache.key("S", grid, spec)
+    assert k == SheetResultCache.key("S", grid.copy(), spec)
+    assert k != SheetResultCache.key("S", changed, spec)
+    assert k != SheetResultCache.key("S", grid, ("year_category", {"dim_name": "tipo"}))
+
+def test_eviction_keeps_size_bounded(tmp_path):
+    cache = SheetResultCache(str(tmp_path), max_bytes=1)
+    df = pd.DataFrame({"year": [2008], "region": ["LIMA"], "metric": ["m"],
+                       "dim_name": [None], "dim_value": [None], "value": [1.0]})
+    assert cache.put("a", df, "OK")
+    assert cache.get("a") is None
+
+def test_mixed_values_cached_and_parallel(workbook_path, tmp_path):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(workbook_path)
+    ws = wb["SINIESTROS POR TIPO"]
+    ws.cell(row=4, column=2).value = "-"  # marcador de dato faltante
+    ws.cell(row=4, column=3).value = 1.5  # decimal junto a enteros
+    wb.save(workbook_path)
+
+    cache = SheetResultCache(str(tmp_path / "cache"))
+    first, logs = normalize_workbook(workbook_path, jobs=2, cache=cache)
+    assert (cache.hits, cache.misses) == (0, len(logs))
+    assert len(list((tmp_path / "cache").glob("*.parquet"))) == sum(m.startswith("OK") for m in logs.values())
+    assert first["value"].dtype == "float64" and 1.5 in first["value"].tolist()
+
+    cache = SheetResultCache(str(tmp_path / "cache"))
+    second, _ = normalize_workbook(workbook_path, jobs=2, cache=cache)
+    assert (cache.hits, cache.misses) == (len(logs), 0)
+    pd.testing.assert_frame_equal(first, second)
+    pd.testing.assert_frame_equal(first, normalize_workbook(workbook_path)[0])
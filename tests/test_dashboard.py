@@ -0,0 +1,137 @@
+import gzip
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from tesis_prevencion_siniestros_transito.dashboard import (PAYLOAD_PATH, aggregate_cube, columnar,
+                                                             prepare_dashboard_data, read_spark_csv, write_detail)
+
+def _decode(block):
+    """Como `toColumns` de dashboard_enhanced.html."""
+    cols = {}
+    for name, kind, values in zip(block["columns"], block["types"], block["data"]):
+        if kind == "dictionary":
+            values = [None if i is None else values["dictionary"][i] for i in values["indices"]]
+        cols[name] = values
+    return pd.DataFrame(cols)
+
+def _models(tmp_path):
+    """Carpetas como las escribe Spark: varios part files (uno vacío) y `_SUCCESS`."""
+    models = tmp_path / "models"
+    pred = models / "predictions_best_model"
+    future = models / "future_predictions_2024_2025"
+    for path in (pred, future):
+        path.mkdir(parents=True)
+        (path / "_SUCCESS").touch()
+    rows = pd.DataFrame({"year": [2022, 2022, 2023], "region": ["LIMA", "CUSCO", "LIMA"],
+                         "siniestros_total__total": [100.0, 10.0, 110.0], "prediction": [90.0, 16.0, 110.0],
+                         "relative_error": [0.1, 0.6, 0.0]})
+    rows.iloc[:2].to_csv(pred / "part-00000-abc.csv", index=False)
+    rows.iloc[2:].to_csv(pred / "part-00001-abc.csv", index=False)
+    rows.iloc[:0].to_csv(pred / "part-00002-abc.csv", index=False)
+    (pred / "part-00003-abc.csv").touch()
+    pd.DataFrame({"year": [2024, 2024], "region": ["LIMA", "CUSCO"], "predicted_accidents": [120.5, 11.25]}).to_csv(
+        future / "part-00000-abc.csv", index=False)
+    return models
+
+def test_columnar_payload_roundtrip(tmp_path):
+    out = tmp_path / "web"
+    payload = prepare_dashboard_data(str(_models(tmp_path)), str(out), arrow=True)
+    body = (out / PAYLOAD_PATH).read_bytes()
+    assert json.loads(body) == payload
+    assert gzip.decompress((out / f"{PAYLOAD_PATH}.gz").read_bytes()) == body
+    assert b" " not in body
+
+    assert "predictions" not in payload
+    cube = _decode(payload["cube"])
+    assert payload["cube"]["types"][:3] == ["dictionary", "int32", "int32"]
+    assert cube[["region", "year", "actual", "error_p50"]].values.tolist() == [
+        ["CUSCO", 2022, 10.0, 60.0], ["LIMA", 2022, 100.0, 10.0], ["LIMA", 2023, 110.0, 0.0]]
+    assert _decode(payload["national"])[["year", "n", "predicted"]].values.tolist() == [[2022, 2, 106.0],
+                                                                                         [2023, 1, 110.0]]
+    assert payload["regions"] == ["LIMA", "CUSCO"]
+    assert payload["metrics"]["within_50pct"] == 2 / 3 * 100
+    assert _decode(payload["future"])["predicted_accidents"].tolist() == [120.5, 11.25]
+
+    # detalle por región, pedido solo al elegirla
+    assert payload["detail"] == {"CUSCO": "dashboard_detail/cusco.json", "LIMA": "dashboard_detail/lima.json"}
+    lima = _decode(json.loads((out / payload["detail"]["LIMA"]).read_text()))
+    assert lima["error_pct"].tolist() == [10.0, 0.0]
+
+    with pa.ipc.open_file(str(out / "dashboard_future.arrow")) as reader:
+        future = reader.read_pandas()
+    assert future["region"].astype(str).tolist() == ["LIMA", "CUSCO"]
+
+def test_aggregate_cube_percentiles():
+    preds = pd.DataFrame({"region": ["A", "A", "A", "B"], "year": [2022] * 4, "actual": [1.0, 2.0, 3.0, 4.0],
+                          "predicted": [1.0, 2.0, 3.0, 8.0], "error_pct": [0.0, 30.0, 60.0, 100.0]})
+    cube = aggregate_cube(preds)
+    a = cube["cube"].iloc[0]
+    assert (a["n"], a["error_p50"], a["error_p90"]) == (3, 30.0, 54.0)
+    assert a["within_20pct"] == pytest.approx(100 / 3) and a["within_50pct"] == pytest.approx(200 / 3)
+    assert cube["national"][["n", "actual", "error_mean"]].values.tolist() == [[4, 10.0, 47.5]]
+
+def test_columnar_nulls_and_missing_outputs(tmp_path):
+    block = columnar(pd.DataFrame({"x": [1.23456, np.nan], "r": ["A", None]}))
+    assert block["data"] == [[1.235, None], {"dictionary": ["A"], "indices": [0, None]}]
+    payload = prepare_dashboard_data(str(tmp_path / "sin_modelos"), str(tmp_path))
+    assert payload["cube"]["length"] == 0 and payload["future"]["length"] == 0
+    assert payload["metrics"] == {} and payload["regions"] == [] and payload["detail"] == {}
+
+def test_spark_parts_success_and_skip_unchanged(tmp_path):
+    models = _models(tmp_path)
+    pred = read_spark_csv(models / "predictions_best_model")
+    assert pred["region"].tolist() == ["LIMA", "CUSCO", "LIMA"] and pred["year"].dtype == np.int64
+
+    out = tmp_path / "web"
+    first = prepare_dashboard_data(str(models), str(out))
+    stamp = (out / PAYLOAD_PATH).stat().st_mtime_ns
+    assert prepare_dashboard_data(str(models), str(out)) == first
+    assert (out / PAYLOAD_PATH).stat().st_mtime_ns == stamp  # sin cambios: no se reescribe
+
+    part = models / "predictions_best_model" / "part-00001-abc.csv"
+    pd.DataFrame({"year": [2023], "region": ["LIMA"], "siniestros_total__total": [110.0],
+                  "prediction": [121.0], "relative_error": [0.1]}).to_csv(part, index=False)
+    os.utime(part, ns=(0, 1))
+    assert prepare_dashboard_data(str(models), str(out))["inputs"] != first["inputs"]
+    assert _decode(json.loads((out / PAYLOAD_PATH).read_text())["cube"])["predicted"].tolist()[-1] == 121.0
+
+    (models / "predictions_best_model" / "_SUCCESS").unlink()
+    with pytest.raises(ValueError, match="_SUCCESS"):
+        prepare_dashboard_data(str(models), str(out), force=True)
+
+def test_success_without_parts_is_empty(tmp_path):
+    """Carpetas con `_SUCCESS` y `.crc` pero sin part CSV (como `notebooks/models`)."""
+    models = tmp_path / "models"
+    for name in ("predictions_best_model", "future_predictions_2024_2025"):
+        (models / name).mkdir(parents=True)
+        (models / name / "_SUCCESS").touch()
+        (models / name / "._SUCCESS.crc").touch()
+    assert read_spark_csv(models / "predictions_best_model") is None
+    payload = prepare_dashboard_data(str(models), str(tmp_path))
+    assert payload["cube"]["length"] == 0 and payload["regions"] == [] and payload["metrics"] == {}
+
+def test_zero_actual_without_relative_error(tmp_path):
+    """Sin `relative_error`, un real 0 deja el error nulo (como el notebook) y no inf."""
+    pred = tmp_path / "models" / "predictions_best_model"
+    pred.mkdir(parents=True)
+    (pred / "_SUCCESS").touch()
+    pd.DataFrame({"year": [2022, 2022], "region": ["LIMA", "CUSCO"], "siniestros_total__total": [0.0, 10.0],
+                  "prediction": [5.0, 12.0]}).to_csv(pred / "part-00000.csv", index=False)
+    payload = prepare_dashboard_data(str(tmp_path / "models"), str(tmp_path))
+    cube = _decode(payload["cube"]).set_index("region")
+    assert cube.loc["LIMA", ["error_mean", "error_p90", "within_20pct"]].isna().all()
+    assert cube.loc["CUSCO", "error_mean"] == 20.0
+    assert payload["metrics"]["mean_error"] == 20.0 and payload["metrics"]["within_50pct"] == 100.0
+    assert json.loads((tmp_path / PAYLOAD_PATH).read_text())["metrics"]["within_20pct"] == 100.0
+
+def test_detail_names_unique_per_region(tmp_path):
+    preds = pd.DataFrame({"region": ["SAN MARTIN", "SAN MARTÍN", "LIMA"], "year": [2022] * 3,
+                          "actual": [1.0, 2.0, 3.0], "predicted": [1.0, 2.0, 3.0], "error_pct": [0.0] * 3})
+    paths = write_detail(preds, str(tmp_path))
+    assert paths == {"LIMA": "dashboard_detail/lima.json", "SAN MARTIN": "dashboard_detail/san_martin.json",
+                     "SAN MARTÍN": "dashboard_detail/san_martin_2.json"}
+    assert _decode(json.loads((tmp_path / paths["SAN MARTÍN"]).read_text()))["actual"].tolist() == [2.0]
@@ -0,0 +1,45 @@
+from tesis_prevencion_siniestros_transito.dataset import head_long, read_long, summarize_long, write_long_dataset
+from tesis_prevencion_siniestros_transito.normalize import normalize_workbook
+from tesis_prevencion_siniestros_transito.schema import apply_output_schema, write_parquet
+
+def test_partitioned_dataset_prunes(workbook_path, tmp_path):
+    df = apply_output_schema(normalize_workbook(workbook_path)[0])
+    root = tmp_path / "ds"
+    write_long_dataset(df, str(root), max_rows_per_group=10)
+    assert (root / "metric=siniestros_total" / "year=2008").is_dir()
+    assert len(read_long(str(root))) == len(df)
+    sel = read_long(str(root), metrics=["siniestros_por_dia"], years=(2009, 2010))
+    expected = df[(df["metric"] == "siniestros_por_dia") & df["year"].between(2009, 2010)]
+    assert len(sel) == len(expected) > 0
+    assert sel["year"].dtype == "int16"
+    assert list(sel.columns) == list(df.columns)
+
+def test_rewrite_drops_stale_partitions(workbook_path, tmp_path):
+    df = apply_output_schema(normalize_workbook(workbook_path)[0])
+    root = tmp_path / "ds"
+    root.mkdir()
+    (root / "_LEEME.txt").write_text("no es una partición")
+    write_long_dataset(df, str(root))
+    fewer = df[(df["metric"] == "siniestros_total") & (df["year"] < 2010)].reset_index(drop=True)
+    write_long_dataset(fewer, str(root))
+    assert len(read_long(str(root))) == len(fewer)
+    assert sorted(p.name for p in root.iterdir()) == ["_LEEME.txt", "metric=siniestros_total"]
+    assert sorted(p.name for p in (root / "metric=siniestros_total").iterdir()) == ["year=2008", "year=2009"]
+
+def test_summarize_long_from_metadata(workbook_path, tmp_path):
+    df = apply_output_schema(normalize_workbook(workbook_path)[0])
+    single = tmp_path / "long.parquet"
+    write_parquet(df, str(single))
+    root = tmp_path / "ds"
+    write_long_dataset(df, str(root), max_rows_per_group=10)
+    sel = df[(df["metric"] == "siniestros_por_dia") & df["year"].between(2009, 2010)]
+    for path in (single, root):
+        full = summarize_long(str(path))
+        assert full.rows == len(df) and full.problems == []
+        assert full.metrics == df["metric"].value_counts().to_dict()
+        assert full.years == (df["year"].min(), df["year"].max())
+        assert full.values == (df["value"].min(), df["value"].max())
+        part = summarize_long(str(path), metrics=["siniestros_por_dia"], years=(2009, 2010))
+        assert part.rows == len(sel) and part.metrics == {"siniestros_por_dia": len(sel)}
+        assert part.years == (2009, 2010)
+    assert len(head_long(str(root), 5, metrics=["siniestros_total"])) == 5
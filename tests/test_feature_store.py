@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from tesis_prevencion_siniestros_transito.feature_store import FeatureStore
+from tesis_prevencion_siniestros_transito.model_artifact import LinearModel, ModelArtifact, request_frame
+from tesis_prevencion_siniestros_transito.pipeline import GOLD_PATH
+
+FEATURES = ["y_lag1", "growth_y", "idx_finde", "years_since_2008", "is_covid_period", "is_lima", "region_size_idx"]
+
+@pytest.fixture
+def gold_path(gold_workdir):
+    return gold_workdir / GOLD_PATH
+
+def _artifact():
+    coef = np.arange(1.0, len(FEATURES) + 1)
+    return ModelArtifact("m", FEATURES, np.ones(len(FEATURES)), "region_size_category", "region_size_idx",
+                         ["small"], {"default": LinearModel(coef, 0.0)})
+
+def test_matrix_matches_request_frame(gold_path):
+    art = _artifact()
+    store = FeatureStore(str(gold_path), art)
+    assert store.regions == ["AREQUIPA", "CUSCO", "LIMA"]
+    regions, years = ["LIMA", "CUSCO", "LIMA", "AREQUIPA"], [2009, 2011, 2024, 2030]
+    overrides = [None, {"y_lag1": 5.0}, None, {"growth_y": 0.1}]
+    expected = art.design_matrix(request_frame(pd.read_parquet(gold_path), regions, years, overrides))
+    np.testing.assert_array_equal(store.matrix(regions, years, overrides), expected)
+
+    with pytest.raises(ValueError, match="Región desconocida"):
+        store.matrix(["PUNO"], [2010])
+    with pytest.raises(ValueError, match="No hay datos"):
+        store.matrix(["LIMA"], [2001])
+    with pytest.raises(ValueError, match="Feature desconocida"):
+        store.matrix(["LIMA"], [2010], [{"region_size_idx": 1.0}])
+
+def test_refresh_picks_up_new_snapshot(gold_path):
+    store = FeatureStore(str(gold_path), _artifact(), check_every=0.0)
+    assert not store.refresh()
+    gold = pd.read_parquet(gold_path)
+    gold = gold[gold["region"] != "CUSCO"]
+    gold.to_parquet(gold_path, index=False)
+    os.utime(gold_path, ns=(0, 1))  # mtime distinto aunque el reloj no avance
+    assert store.refresh()
+    assert store.regions == ["AREQUIPA", "LIMA"]
+
+def test_refresh_picks_up_new_artifact(gold_path, tmp_path):
+    model_path = tmp_path / "modelo.npz"
+    _artifact().save(str(model_path))
+    store = FeatureStore(str(gold_path), _artifact(), check_every=0.0, model_path=str(model_path))
+    version = store.version
+    assert not store.refresh()
+    art = _artifact()._replace(name="nuevo")
+    art.save(str(model_path))
+    os.utime(model_path, ns=(0, 1))
+    assert store.refresh()
+    assert store.artifact.name == "nuevo" and store.version != version
+
+def test_refresh_keeps_last_good_state(gold_path, caplog):
+    store = FeatureStore(str(gold_path), _artifact(), check_every=0.0)
+    expected = store.matrix(["LIMA"], [2010])
+    good = gold_path.read_bytes()
+
+    gold_path.unlink()  # overwrite de Spark: la carpeta/archivo se borra primero
+    assert not store.refresh()
+    gold_path.write_bytes(good[: len(good) // 2])  # a medio escribir
+    assert not store.refresh()
+    assert "se mantiene el estado anterior" in caplog.text
+    assert store.regions == ["AREQUIPA", "CUSCO", "LIMA"]
+    np.testing.assert_array_equal(store.matrix(["LIMA"], [2010]), expected)
+
+    gold_path.write_bytes(good)
+    os.utime(gold_path, ns=(0, 1))
+    assert store.refresh()
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+from tesis_prevencion_siniestros_transito.features import build_lag_features, segment_offsets
+
+def test_segment_offsets():
+    starts, pos = segment_offsets(np.array([0, 0, 0, 1, 2, 2]))
+    assert starts.tolist() == [0, 3, 4]
+    assert pos.tolist() == [0, 1, 2, 0, 0, 1]
+
+def test_lags_and_windows_match_groupby():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({"region": np.repeat(["B", "A", "C"], 8), "year": np.tile(np.arange(2008, 2016), 3),
+                       "v": rng.integers(0, 500, 24).astype(float)})
+    df = df.drop(index=[3, 17]).sample(frac=1, random_state=0)  # años faltantes y filas desordenadas
+    out = build_lag_features(df, "v", lags=(1, 2, 5), windows=(2, 4), prefix="v")
+    ref = df.sort_values(["region", "year"]).reset_index(drop=True)
+    g = ref.groupby("region")["v"]
+    assert out[["region", "year"]].equals(ref[["region", "year"]])
+    for k in (1, 2, 5):
+        np.testing.assert_array_equal(out[f"v_lag{k}"], g.shift(k))
+    prev = g.shift(1).groupby(ref["region"])
+    for w in (2, 4):
+        np.testing.assert_allclose(out[f"rolling_avg_{w}y"],
+                                   prev.rolling(w, min_periods=1).mean().reset_index(level=0, drop=True))
+        np.testing.assert_allclose(out[f"rolling_std_{w}y"],
+                                   prev.rolling(w, min_periods=2).std().reset_index(level=0, drop=True))
+    lag1 = out["v_lag1"]
+    np.testing.assert_allclose(out["growth_v"], np.where(lag1 > 0, (out["v"] - lag1) / lag1, 0.0))
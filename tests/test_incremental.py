@@ -0,0 +1,51 @@
+import pandas as pd
+from tesis_prevencion_siniestros_transito.normalize import normalize_workbook
+from tesis_prevencion_siniestros_transito.pipeline import run_pipeline
+from tesis_prevencion_siniestros_transito.schema import apply_output_schema, write_parquet
+
+def _write(df, path):
+    write_parquet(df.reset_index(drop=True), str(path))
+    return str(path)
+
+def test_incremental_matches_full_rebuild(workbook_path, tmp_path):
+    long = apply_output_schema(normalize_workbook(workbook_path)[0])
+    run_pipeline(_write(long[long["year"] < 2011], tmp_path / "a.parquet"), str(tmp_path / "inc"))
+
+    # llega 2011 y se corrige un valor de 2009 en LIMA
+    after = long.copy()
+    fix = (after["year"] == 2009) & (after["region"] == "LIMA") & (after["metric"] == "siniestros_total")
+    after.loc[fix, "value"] += 5
+    src = _write(after, tmp_path / "b.parquet")
+    got = run_pipeline(src, str(tmp_path / "inc"), incremental=True)
+    expected = run_pipeline(src, str(tmp_path / "full"))
+    assert got["cambios"]["modo"] == "incremental"
+    assert got["cambios"]["claves_nuevas_o_cambiadas"] == 4  # 3 regiones en 2011 + LIMA 2009
+    pd.testing.assert_frame_equal(got["features"], expected["features"])
+    pd.testing.assert_frame_equal(
+        pd.read_parquet(tmp_path / "inc" / "gold_local" / "siniestros_features_enhanced.parquet"),
+        expected["features"])
+
+    again = run_pipeline(src, str(tmp_path / "inc"), incremental=True)
+    assert again["cambios"]["modo"] == "sin cambios"
+
+def test_incremental_removed_key_and_vanished_column(workbook_path, tmp_path):
+    long = apply_output_schema(normalize_workbook(workbook_path)[0])
+    run_pipeline(_write(long, tmp_path / "a.parquet"), str(tmp_path / "inc"))
+
+    # se elimina CUSCO 2010 (todas sus métricas): solo se recalcula lo que depende de esa fila
+    region = long["region"].astype(str).str.strip().str.upper()
+    no_key = long[~((region == "CUSCO") & (long["year"] == 2010))]
+    src = _write(no_key, tmp_path / "b.parquet")
+    got = run_pipeline(src, str(tmp_path / "inc"), incremental=True)
+    expected = run_pipeline(src, str(tmp_path / "full"))
+    assert got["cambios"]["modo"] == "incremental" and got["cambios"]["claves_eliminadas"] == 1
+    pd.testing.assert_frame_equal(got["features"], expected["features"])
+
+    # desaparece una categoría en todas las claves: sus columnas no pueden quedar en gold
+    no_domingo = no_key[no_key["dim_value"].astype(str) != "DOMINGO"]
+    src = _write(no_domingo, tmp_path / "c.parquet")
+    got = run_pipeline(src, str(tmp_path / "inc"), incremental=True)
+    expected = run_pipeline(src, str(tmp_path / "full"))
+    assert got["cambios"]["modo"] == "completo" and "domingo" in got["cambios"]["motivo"]
+    assert not [c for c in got["features"].columns if "domingo" in c]
+    pd.testing.assert_frame_equal(got["features"], expected["features"])
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+from tesis_prevencion_siniestros_transito.model_artifact import (LinearModel, ModelArtifact, TreeEnsemble,
+                                                                 from_spark, load_artifact, request_features,
+                                                                 request_frame, spark_submodel)
+from tesis_prevencion_siniestros_transito.pipeline import GOLD_PATH, TOTAL_COL
+
+def _stump(feature, threshold, low, high):
+    """Árbol de un split: raíz + dos hojas."""
+    return ([feature, -1, -1], [threshold, np.nan, np.nan], [1, -1, -1], [2, -1, -1], [0.0, low, high])
+
+def _forest(*stumps, weights=None, divisor=None, log_target=False):
+    parts = [np.concatenate([np.asarray(s[i], dtype=float) for s in stumps]) for i in range(5)]
+    offsets = np.arange(len(stumps)) * 3
+    shift = np.repeat(offsets, 3)
+    feature, threshold, left, right, value = parts
+    left = np.where(left >= 0, left + shift, -1).astype(np.int64)
+    right = np.where(right >= 0, right + shift, -1).astype(np.int64)
+    weights = np.ones(len(stumps)) if weights is None else np.asarray(weights, dtype=float)
+    return TreeEnsemble(feature.astype(np.int64), threshold, left, right, value, offsets, weights,
+                        float(divisor or len(stumps)), log_target)
+
+def _artifact(models):
+    return ModelArtifact("prueba", ["x", "is_lima", "size_idx"], np.array([0.5, 1.0, 1.0]), "size", "size_idx",
+                         ["large", "small"], models, {"RMSE": 3.0})
+
+def test_trees_linear_and_routing_roundtrip(tmp_path):
+    forest = _forest(_stump(0, 1.0, 10.0, 20.0), _stump(2, 0.5, 1.0, 3.0))
+    lima = LinearModel(np.array([1.0, 0.0, 0.0]), 0.0, "log")
+    art = _artifact({"default": forest, "lima": lima})
+    df = pd.DataFrame({"x": [2.0, 4.0, None, 2.0], "is_lima": [0, 0, 0, 1],
+                       "size": ["large", "small", "nueva", "large"]})
+    X = art.design_matrix(df)
+    assert X[:, 2].tolist() == [0, 1, 2, 0]  # etiqueta desconocida -> len(labels)
+    # x escalado = x * 0.5: 1.0 <= 1.0 va a la izquierda
+    expected = [(10 + 1) / 2, (20 + 3) / 2, (10 + 3) / 2, np.exp(1.0)]
+    np.testing.assert_allclose(art.predict(X), expected)
+
+    art.save(str(tmp_path / "modelo.npz"))
+    loaded = load_artifact(str(tmp_path / "modelo.npz"))
+    assert loaded.features == art.features and loaded.labels == art.labels
+    np.testing.assert_array_equal(loaded.predict(X), art.predict(X))
+    pred, lower, upper = loaded.predict_interval(X)
+    assert (lower[:3] <= pred[:3]).all() and (pred[:3] <= upper[:3]).all()
+    assert upper[3] - pred[3] == pytest.approx(3.0)  # GLM: +- RMSE
+
+    with pytest.raises(ValueError, match="Faltan columnas"):
+        art.design_matrix(df.drop(columns="x"))
+
+def test_gbt_weights_and_log_target():
+    gbt = _forest(_stump(0, 0.0, 1.0, 2.0), _stump(0, 0.0, -1.0, 1.0), weights=[1.0, 0.1], divisor=1,
+                  log_target=True)
+    np.testing.assert_allclose(gbt.predict(np.array([[-1.0], [1.0]])), np.expm1([0.9, 2.1]))
+
+def test_request_features_projects_future_year():
+    gold = pd.DataFrame({"region": ["LIMA", "LIMA"], "year": [2022, 2023], TOTAL_COL: [5.0, 6.0],
+                         "y_lag1": [4.0, 5.0], "growth_y": [0.25, 0.2], "years_since_2008": [14, 15],
+                         "is_covid_period": [0, 0]})
+    assert request_features(gold, "LIMA", 2022)["y_lag1"][0] == 4.0
+    row = request_features(gold, "LIMA", 2025, {"y_lag1": 9.0})
+    assert row[["year", "years_since_2008", "growth_y", "y_lag1"]].iloc[0].tolist() == [2025, 17, 0.02, 9.0]
+    with pytest.raises(ValueError, match="Región desconocida"):
+        request_features(gold, "CUSCO", 2023)
+    with pytest.raises(ValueError, match="Feature desconocida"):
+        request_features(gold, "LIMA", 2023, {"foo": 1.0})
+
+def test_request_frame_matches_single_requests():
+    gold = pd.DataFrame({"region": ["LIMA", "LIMA", "CUSCO"], "year": np.array([2022, 2023, 2023], dtype="int32"),
+                         TOTAL_COL: [5.0, 6.0, 2.0], "y_lag1": [4.0, 5.0, 1.0], "growth_y": [0.25, 0.2, 1.0],
+                         "years_since_2008": np.array([14, 15, 15], dtype="int32"), "is_covid_period": [0, 0, 0]})
+    keys = [("CUSCO", 2024, None), ("LIMA", 2022, {"y_lag1": 7.0}), ("LIMA", 2025, None)]
+    batch = request_frame(gold, *zip(*keys))
+    single = pd.concat([request_features(gold, *k) for k in keys], ignore_index=True)
+    pd.testing.assert_frame_equal(batch, single)
+    assert batch.dtypes.equals(gold.dtypes)
+    assert batch["y_lag1"].tolist() == [1.0, 7.0, 5.0]
+    with pytest.raises(ValueError, match="No hay datos de LIMA para 2021"):
+        request_frame(gold, ["CUSCO", "LIMA"], [2023, 2021])
+
+def test_spark_models_match_artifact(gold_workdir, spark):
+    from pyspark.ml import Pipeline
+    from pyspark.ml.feature import StandardScaler, StringIndexer, VectorAssembler
+    from pyspark.ml.regression import GBTRegressor, GeneralizedLinearRegression, RandomForestRegressor
+
+    gold = pd.read_parquet(gold_workdir / GOLD_PATH).fillna(0.0)
+    gold["log_total"] = np.log1p(gold[TOTAL_COL])
+    feature_cols = ["y_lag1", "growth_y", "idx_finde", "years_since_2008", "is_lima"]
+    df = spark.createDataFrame(gold)
+    feature_model = Pipeline(stages=[
+        StringIndexer(inputCol="region_size_category", outputCol="region_size_idx", handleInvalid="keep"),
+        VectorAssembler(inputCols=feature_cols + ["region_size_idx"], outputCol="features_raw",
+                        handleInvalid="keep"),
+        StandardScaler(inputCol="features_raw", outputCol="features", withStd=True, withMean=False),
+    ]).fit(df)
+    prepared = feature_model.transform(df)
+    for estimator, log_target in ((RandomForestRegressor(labelCol=TOTAL_COL, numTrees=5, seed=42), False),
+                                  (GBTRegressor(labelCol="log_total", maxIter=5, seed=42), True),
+                                  (GeneralizedLinearRegression(family="poisson", labelCol=TOTAL_COL), False)):
+        model = estimator.fit(prepared)
+        art = from_spark("m", feature_model, {"default": spark_submodel(model, log_target)})
+        expected = np.array([r.prediction for r in model.transform(prepared).select("prediction").collect()])
+        expected = np.expm1(expected) if log_target else expected
+        np.testing.assert_allclose(art.predict_frame(gold), expected, rtol=1e-9)
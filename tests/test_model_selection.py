@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from tesis_prevencion_siniestros_transito.model_selection import (Candidate, data_quality, prepare_features,
+                                                                  run_model_selection, time_series_splits,
+                                                                  validation_report, write_report)
+from tesis_prevencion_siniestros_transito.pipeline import TOTAL_COL
+
+def test_time_series_splits_match_notebook():
+    years = list(range(2008, 2024))
+    splits = time_series_splits(reversed(years))
+    assert [(s.split, s.train_years[-1], s.test_years) for s in splits] == [
+        (1, 2017, [2018, 2019]), (2, 2019, [2020, 2021]), (3, 2021, [2022, 2023])]
+    assert splits[0].train_years[0] == 2008
+    # con pocos años se omiten las particiones sin historia suficiente (numeración intacta)
+    assert [s.split for s in time_series_splits(range(2008, 2018))] == [2, 3]
+    assert time_series_splits(range(2008, 2012)) == []
+
+def _model_frame(spark):
+    rng = np.random.default_rng(0)
+    rows = []
+    for region, base, size in (("LIMA", 5000.0, "large"), ("CUSCO", 800.0, "medium"), ("PUNO", 300.0, "small")):
+        prev = base
+        for year in range(2012, 2024):
+            total = base * (1 + 0.03 * (year - 2012)) + rng.normal(0, base * 0.02)
+            rows.append((year, region, float(region == "LIMA"), size, prev, year - 2008, total))
+            prev = total
+    gold = pd.DataFrame(rows, columns=["year", "region", "is_lima", "region_size_category", "y_lag1",
+                                       "years_since_2008", TOTAL_COL])
+    gold["log_total"] = np.log1p(gold[TOTAL_COL])
+    return spark.createDataFrame(gold)
+
+def test_runner_matches_serial_evaluation(spark, tmp_path):
+    from pyspark.ml.evaluation import RegressionEvaluator
+    from pyspark.ml.regression import GeneralizedLinearRegression, RandomForestRegressor
+    from pyspark.sql import functions as F
+
+    df = _model_frame(spark)
+    feature_model, prepared = prepare_features(df, ["y_lag1", "years_since_2008", "is_lima"])
+    assert prepared.is_cached and "features_raw" not in prepared.columns
+    candidates = [
+        Candidate("GLM", lambda seed: {"default": (GeneralizedLinearRegression(labelCol=TOTAL_COL), False)}),
+        Candidate("RF", lambda seed: {"default": (RandomForestRegressor(labelCol=TOTAL_COL, numTrees=3,
+                                                                        seed=seed), False)}),
+        Candidate("Lima", lambda seed: {
+            "lima": (RandomForestRegressor(labelCol="log_total", numTrees=3, seed=seed), True),
+            "default": (GeneralizedLinearRegression(labelCol=TOTAL_COL), False)}),
+    ]
+    sel = run_model_selection(prepared, candidates, cv_models=("RF",), n_splits=2, max_workers=3)
+
+    assert (sel.train_size, sel.test_size) == (30, 6)
+    assert set(sel.results) == {"GLM", "RF", "Lima"}
+    assert sel.best_model == min(sel.results, key=lambda m: sel.results[m]["RMSE"])
+    # mismas métricas que el paso 8 en serie con RegressionEvaluator
+    serial = GeneralizedLinearRegression(labelCol=TOTAL_COL).fit(prepared.filter(F.col("year") <= 2021))
+    pred = serial.transform(prepared.filter(F.col("year") > 2021))
+    for metric in ("rmse", "mae"):
+        expected = RegressionEvaluator(labelCol=TOTAL_COL, metricName=metric).evaluate(pred)
+        assert sel.results["GLM"][metric.upper()] == pytest.approx(expected, rel=1e-9)
+    lima = sel.predictions["Lima"].filter(F.col("region") == "LIMA").select("prediction").first()[0]
+    assert lima > 1000  # sub-modelo en log1p devuelto en la escala original
+    assert sel.models["Lima"]["lima"][1] is True
+
+    assert [(r["model"], r["split"], r["test_years"]) for r in sel.cross_validation] == [
+        ("RF", 1, "2020-2021"), ("RF", 2, "2022-2023")]
+
+    report = validation_report(sel, data_quality(df, prepared, sel))
+    assert report["data_quality"] == {"total_regions": 3, "years_covered": 12, "records_processed": 36,
+                                      "records_in_model": 36, "train_size": 30, "test_size": 6}
+    assert report["best_model"]["name"] == sel.best_model
+    path = write_report(report, tmp_path / "models" / "validation_report.json")
+    assert json.loads(path.read_text())["cross_validation"][0]["split"] == 1
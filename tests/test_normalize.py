@@ -0,0 +1,50 @@
+import pytest
+import pandas as pd
+from tesis_prevencion_siniestros_transito import normalize
+from tesis_prevencion_siniestros_transito.normalize import WorkbookReader, normalize_workbook
+
+def test_workbook_opened_once(workbook_path, monkeypatch):
+    opened = []
+    real = pd.ExcelFile
+    def counting(*a, **kw):
+        opened.append(a)
+        return real(*a, **kw)
+    monkeypatch.setattr(normalize.pd, "ExcelFile", counting)
+    monkeypatch.setattr(normalize.pd, "read_excel", None)  # ningún parser debe releer el archivo
+    df, logs = normalize_workbook(workbook_path)
+    assert len(opened) == 1
+    assert all(msg.startswith("OK") for msg in logs.values())
+    assert set(df["metric"]) >= {"siniestros_total", "siniestros_por_tipo", "otra_hoja"}
+
+def test_reader_matches_path(workbook_path):
+    with WorkbookReader(workbook_path) as book:
+        from_book = normalize.parse_year_category_by_region(book, "DÍA", dim_name="dia_semana")
+        assert book.raw("DÍA") is book.raw("DÍA")
+    from_path = normalize.parse_year_category_by_region(workbook_path, "DÍA", dim_name="dia_semana")
+    pd.testing.assert_frame_equal(from_book, from_path)
+
+def test_parallel_matches_serial(workbook_path):
+    serial, serial_logs = normalize_workbook(workbook_path)
+    parallel, parallel_logs = normalize_workbook(workbook_path, jobs=2)
+    assert list(parallel_logs.items()) == list(serial_logs.items())
+    pd.testing.assert_frame_equal(parallel, serial)
+
+def test_unpivot_order_and_blank_columns():
+    raw = pd.DataFrame([
+        ["t", None, None, None, None, None],
+        ["REG", 2011, None, 2009, None, "TOTAL"],
+        [None, "Z", "A", "A", None, "A"],
+        ["lima", 1, 2, 3, 4, 5],
+        [None, 9, 9, 9, 9, 9],
+        ["cusco", 6, float("nan"), 8, 9, 10],
+    ])
+    out = normalize.parse_year_category_by_region({"s": raw}, "s")
+    assert out[["year", "region", "dim_value", "value"]].values.tolist() == [
+        [2009, "LIMA", "A", 3], [2011, "LIMA", "Z", 1], [2011, "LIMA", "A", 2],
+        [2009, "CUSCO", "A", 8], [2011, "CUSCO", "Z", 6],
+    ]
+
+def test_unpivot_rejects_duplicate_columns():
+    raw = pd.DataFrame([["t", None, None], ["REG", 2011, None], [None, "A", "A"], ["lima", 1, 2]])
+    with pytest.raises(ValueError):
+        normalize.parse_year_category_by_region({"s": raw}, "s")
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from tesis_prevencion_siniestros_transito.pipeline import GOLD_PATH, TOTAL_COL, run_pipeline
+
+def test_pandas_pipeline_layers(long_parquet, tmp_path):
+    layers = run_pipeline(long_parquet, str(tmp_path))
+    assert (tmp_path / GOLD_PATH).exists()
+    assert set(layers["silver"]["region"]) == {"LIMA", "AREQUIPA", "CUSCO"}
+    wide = layers["wide"]
+    assert len(wide) == 12 and list(wide.columns[:2]) == ["year", "region"]
+    assert list(wide.columns[2:]) == sorted(wide.columns[2:])
+    f = layers["features"]
+    assert list(f.columns[:2]) == ["region", "year"]
+    lima = f[f["region"] == "LIMA"].reset_index(drop=True)
+    y = lima[TOTAL_COL].to_numpy()
+    assert np.isnan(lima["y_lag1"][0]) and lima["y_lag1"][1] == y[0]
+    assert lima["rolling_avg_3y"][3] == pytest.approx(y[:3].mean())
+    assert lima["rolling_std_3y"][3] == pytest.approx(y[:3].std(ddof=1))
+    assert np.isnan(lima["rolling_std_3y"][:2]).all()
+    assert (f["is_lima"] == (f["region"] == "LIMA")).all()
+
+def test_spark_engine_matches_pandas(long_parquet, tmp_path, spark):
+    expected = run_pipeline(long_parquet, str(tmp_path / "pd"))
+    got = run_pipeline(long_parquet, str(tmp_path / "spark"), engine="spark", spark=spark)
+    for name, keys in (("wide", ["year", "region"]), ("features", ["region", "year"])):
+        a = expected[name].sort_values(keys).reset_index(drop=True)
+        b = got[name].toPandas().sort_values(keys).reset_index(drop=True)
+        assert list(a.columns) == list(b.columns)
+        for c in a.columns:
+            if a[c].dtype.kind == "f":
+                np.testing.assert_allclose(a[c], b[c], rtol=1e-12)
+            else:
+                assert a[c].tolist() == b[c].tolist()
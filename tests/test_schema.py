@@ -0,0 +1,42 @@
+import pandas as pd
+from tesis_prevencion_siniestros_transito.normalize import normalize_workbook
+from tesis_prevencion_siniestros_transito.schema import (CATEGORICAL_COLUMNS, apply_output_schema, schema_problems,
+                                                          write_parquet)
+
+def test_output_schema_roundtrip(workbook_path, tmp_path):
+    raw, _ = normalize_workbook(workbook_path)
+    typed = apply_output_schema(raw)
+    assert len(typed) == len(raw)
+    assert typed["year"].dtype == "int16"
+    assert str(typed["value"].dtype) == "Int64"
+    assert all(isinstance(typed[c].dtype, pd.CategoricalDtype) for c in CATEGORICAL_COLUMNS)
+    assert typed.memory_usage(deep=True).sum() < raw.memory_usage(deep=True).sum() / 3
+    write_parquet(typed, tmp_path / "t.parquet")
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "t.parquet"), typed)
+
+def test_non_numeric_values_dropped():
+    df = pd.DataFrame({"year": [2008, 2009], "region": ["LIMA"] * 2, "metric": ["m"] * 2,
+                       "dim_name": [None] * 2, "dim_value": [None] * 2, "value": [1.5, "-"]})
+    typed = apply_output_schema(df)
+    assert typed["value"].tolist() == [1.5] and typed["value"].dtype == "float64"
+
+def test_schema_problems():
+    import pyarrow as pa
+
+    typed = apply_output_schema(pd.DataFrame({"year": [2008], "region": ["LIMA"], "metric": ["m"],
+                                              "dim_name": ["d"], "dim_value": ["v"], "value": [1]}))
+    assert schema_problems(pa.Schema.from_pandas(typed, preserve_index=False)) == []
+    bad = pa.schema([("year", pa.int64()), ("region", pa.string()), ("extra", pa.int8())])
+    assert schema_problems(bad) == [
+        "Falta la columna metric", "Falta la columna dim_name", "Falta la columna dim_value",
+        "Falta la columna value", "Columna inesperada: extra",
+        "year: se esperaba int16, hay int64", "region: se esperaba dictionary<string>, hay string"]
+
+def test_all_null_dimensions_are_text(tmp_path):
+    """Libro con solo la hoja región x año: dim_name/dim_value todo nulo."""
+    import pyarrow.parquet as pq
+
+    df = pd.DataFrame({"year": [2008, 2009], "region": ["LIMA"] * 2, "metric": ["siniestros_total"] * 2,
+                       "dim_name": [None] * 2, "dim_value": [None] * 2, "value": [1, 2]})
+    write_parquet(apply_output_schema(df), tmp_path / "t.parquet")
+    assert schema_problems(pq.read_schema(tmp_path / "t.parquet")) == []
@@ -0,0 +1,96 @@
+import gzip
+import os
+
+import numpy as np
+import pytest
+from tesis_prevencion_siniestros_transito.model_artifact import LinearModel, ModelArtifact
+from tesis_prevencion_siniestros_transito.pipeline import GOLD_PATH
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+
+from tesis_prevencion_siniestros_transito.serving import MODEL_PATH, VENDOR_PATH, create_app  # noqa: E402
+
+def _artifact(coef_years=0.1):
+    features = ["y_lag1", "growth_y", "years_since_2008", "region_size_idx"]
+    return ModelArtifact("Poisson_GLM", features, np.ones(4), "region_size_category", "region_size_idx", ["small"],
+                         {"default": LinearModel(np.array([0.001, 0.0, coef_years, 0.0]), 1.0, "log")},
+                         {"RMSE": 2.0})
+
+@pytest.fixture
+def workdir(gold_workdir):
+    (gold_workdir / MODEL_PATH).parent.mkdir()
+    _artifact().save(str(gold_workdir / MODEL_PATH))
+    return gold_workdir
+
+@pytest.fixture
+def client(workdir):
+    return create_app(workdir=str(workdir), check_every=0.0).test_client()
+
+def test_predict_batch_and_healthz(client):
+    health = client.get("/healthz")
+    assert health.status_code == 200 and health.get_json()["regions"] == 3
+
+    single = client.post("/predict", json={"region": "lima", "year": 2024}).get_json()
+    assert single["status"] == "success" and single["model"] == "Poisson_GLM"
+    r = single["result"]
+    assert r["lower_bound"] <= r["prediction"] <= r["upper_bound"] and r["confidence"] == 80
+
+    batch = client.post("/predict/batch", json={"years": [2024, 2025]}).get_json()["result"]
+    assert batch["region"] == ["AREQUIPA", "AREQUIPA", "CUSCO", "CUSCO", "LIMA", "LIMA"]
+    assert batch["year"] == [2024, 2025] * 3
+    assert batch["prediction"][4] == r["prediction"]
+
+    bad = client.post("/predict", json={"region": "PUNO", "year": 2024})
+    assert bad.status_code == 400 and "PUNO" in bad.get_json()["message"]
+    assert client.post("/predict/batch", json={"inputs": [3]}).status_code == 400
+
+def test_cache_regions_etag_and_invalidation(client, workdir):
+    payload = {"region": "CUSCO", "year": 2024, "month": 3, "weather": "rain"}
+    first = client.post("/predict", json=payload).get_json()["result"]
+    # mes/clima no son features: misma entrada de caché
+    assert client.post("/predict", json={**payload, "month": 7}).get_json()["result"] == first
+    assert client.get("/healthz").get_json()["cache"] == {"entries": 1, "hits": 1, "misses": 1}
+
+    regions = client.get("/regions")
+    assert regions.get_json() == ["AREQUIPA", "CUSCO", "LIMA"]
+    assert regions.headers["Cache-Control"] == "public, max-age=300"
+    again = client.get("/regions", headers={"If-None-Match": regions.headers["ETag"]})
+    assert again.status_code == 304
+
+    _artifact(coef_years=0.2).save(str(workdir / MODEL_PATH))
+    os.utime(workdir / MODEL_PATH, ns=(0, 1))
+    assert client.post("/predict", json=payload).get_json()["result"]["prediction"] > first["prediction"]
+    assert client.get("/healthz").get_json()["cache"]["entries"] == 1
+
+def test_page_precompressed_and_vendored(workdir):
+    vendor_dir = workdir / VENDOR_PATH  # por defecto, bajo la carpeta de trabajo
+    (vendor_dir / "jquery-3.6.0").mkdir(parents=True)
+    (vendor_dir / "jquery-3.6.0" / "jquery.min.js").write_text("window.jQuery = 1;" * 100)
+    client = create_app(workdir=str(workdir)).test_client()
+
+    page = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert page.headers["Content-Encoding"] == "gzip" and page.headers["Cache-Control"] == "no-cache"
+    html = gzip.decompress(page.data).decode("utf-8")
+    assert 'src="/vendor/jquery-3.6.0/jquery.min.js"' in html
+    assert "cdn.jsdelivr.net" in html  # bootstrap no está vendorizado: queda el CDN
+    assert client.get("/", headers={"If-None-Match": page.headers["ETag"],
+                                     "Accept-Encoding": "gzip"}).status_code == 304
+    assert "Content-Encoding" not in client.get("/").headers
+
+    js = client.get("/vendor/jquery-3.6.0/jquery.min.js")
+    assert js.status_code == 200 and "immutable" in js.headers["Cache-Control"]
+    assert client.get("/vendor/../serving.py").status_code == 404
+    assert client.get("/vendor/bootstrap-5.1.3/css/bootstrap.min.css").status_code == 404
+
+def test_missing_gold_snapshot_keeps_serving(client, workdir):
+    (workdir / GOLD_PATH).unlink()  # overwrite en curso
+    assert client.post("/predict", json={"region": "LIMA", "year": 2024}).status_code == 200
+    assert client.get("/regions").get_json() == ["AREQUIPA", "CUSCO", "LIMA"]
+
+def test_explicit_vendor_dir(workdir, tmp_path_factory):
+    vendor_dir = tmp_path_factory.mktemp("libs")
+    (vendor_dir / "jquery-3.6.0").mkdir()
+    (vendor_dir / "jquery-3.6.0" / "jquery.min.js").write_text("window.jQuery = 1;")
+    client = create_app(workdir=str(workdir), vendor_dir=str(vendor_dir)).test_client()
+    assert client.get("/vendor/jquery-3.6.0/jquery.min.js").status_code == 200
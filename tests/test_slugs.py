@@ -0,0 +1,37 @@
+import pandas as pd
+import unicodedata
+
+from tesis_prevencion_siniestros_transito.slugs import slug, slug_series, spark_slug, table_slug
+
+def test_slug():
+    assert slug(" Sábado ") == "sabado"
+    assert slug("20:01 a 22:00") == "20_01_a_22_00"
+    assert slug(None) == "total"
+    assert slug(float("nan")) == "total"
+    assert slug("¿?") == "total"
+
+def test_slug_series_on_distinct_values():
+    s = pd.Series(["Día Útil", None, "Día Útil", "DOMINGO"], dtype="category")
+    assert slug_series(s).tolist() == ["dia_util", "total", "dia_util", "domingo"]
+
+def test_table_slug_outside_latin_range():
+    # guiones largos, comillas tipográficas y puntos suspensivos, como `slug`
+    for value in ("a–b", "x’y", "total…", "a…b", "“Día”", "ﬁn", "Ｎº 1", "km²"):
+        assert table_slug(value) == slug(value), value
+    # todo carácter cuya forma ASCII es uno solo o ninguno (y las ligaduras) coincide
+    for code in range(0x370, 0x10000):
+        if 0xD800 <= code < 0xE000:
+            continue
+        ascii_ = unicodedata.normalize("NFKD", chr(code).lower()).encode("ascii", "ignore").decode("ascii")
+        if len(ascii_) <= 1 or 0xFB00 <= code <= 0xFB06:
+            assert table_slug(f"a{chr(code)}b") == slug(f"a{chr(code)}b"), hex(code)
+
+def test_spark_slug_matches_python(spark):
+    values = ["Sábado ", "20:01 a 22:00", "¿?", "", "  Día Útil", "MAÑANA", "ĳssel", "½ hora", "Ⱥx", None,
+              "a–b", "x’y", "total…", "ﬁn"]
+    df = spark.createDataFrame([(v,) for v in values], "v string")
+    assert [r[0] for r in df.select(spark_slug("v")).collect()] == [slug(v) for v in values]
+    # fuera de lo que `slug` y la tabla comparten, Spark sigue dando lo mismo que `table_slug`
+    chars = [f"a{chr(c)}b" for c in range(0x80, 0x10000) if not 0xD800 <= c < 0xE000]
+    df = spark.createDataFrame([(v,) for v in chars], "v string")
+    assert [r[0] for r in df.select(spark_slug("v")).collect()] == [table_slug(v) for v in chars]
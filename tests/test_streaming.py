@@ -0,0 +1,21 @@
+import pandas as pd
+from tesis_prevencion_siniestros_transito.normalize import LONG_COLUMNS, normalize_workbook
+from tesis_prevencion_siniestros_transito.streaming import stream_workbook
+
+def _canon(df):
+    df = df.copy()
+    df["value"] = df["value"].astype(float)
+    df["year"] = df["year"].astype(int)
+    for col in ("region", "metric", "dim_name", "dim_value"):
+        df[col] = df[col].astype(object).where(df[col].notna(), None)
+    return df[LONG_COLUMNS].sort_values(LONG_COLUMNS).reset_index(drop=True)
+
+def test_streaming_matches_in_memory(workbook_path, tmp_path):
+    out_csv, out_pq = tmp_path / "s.csv", tmp_path / "s.parquet"
+    writer, logs = stream_workbook(workbook_path, str(out_csv), str(out_pq), batch_rows=7)
+    expected, expected_logs = normalize_workbook(workbook_path)
+    assert logs == expected_logs
+    assert writer.rows == len(expected)
+    pd.testing.assert_frame_equal(_canon(pd.read_parquet(out_pq)), _canon(expected))
+    from_csv = pd.read_csv(out_csv)
+    assert from_csv["metric"].value_counts().to_dict() == expected["metric"].value_counts().to_dict()
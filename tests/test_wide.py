@@ -0,0 +1,17 @@
+import numpy as np
+from tesis_prevencion_siniestros_transito.normalize import normalize_workbook
+from tesis_prevencion_siniestros_transito.schema import apply_output_schema
+from tesis_prevencion_siniestros_transito.wide import load_npz, pivot_coo, pivot_wide
+
+def test_sparse_matches_dense(workbook_path, tmp_path):
+    df = apply_output_schema(normalize_workbook(workbook_path)[0])
+    for fillna0 in (False, True):
+        dense = pivot_wide(df, fillna0=fillna0)
+        coo = pivot_coo(df, fillna0=fillna0)
+        coo.save_npz(tmp_path / "w.npz")
+        sparse = load_npz(tmp_path / "w.npz").to_sparse_frame()
+        assert list(sparse.columns) == list(dense.columns)
+        assert sparse["region"].tolist() == dense["region"].tolist()
+        assert np.array_equal(sparse.iloc[:, 2:].sparse.to_dense().to_numpy(),
+                              dense.iloc[:, 2:].to_numpy(dtype=float), equal_nan=True)
+        assert len(coo.to_long()) == len(coo.data) < dense.shape[0] * (dense.shape[1] - 2)